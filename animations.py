@@ -8,9 +8,33 @@ import tkinter as tk
 from tkinter import Canvas
 import math
 import random
+from functools import lru_cache
 from typing import Callable, Optional
 
 
+@lru_cache(maxsize=256)
+def _lighten_hex(color: str, amount: int) -> str:
+    """Lighten a #rrggbb color, or return it unchanged if it can't be parsed.
+    
+    Cached: the app only ever lightens a small palette of card and button
+    colors, so each result is computed once.
+    """
+    try:
+        # Parse once as a packed 24-bit int and clamp each channel
+        rgb = int(color[1:7], 16) if len(color) >= 7 else -1
+        if rgb < 0:
+            return color
+        r = (rgb >> 16) + amount
+        g = ((rgb >> 8) & 0xFF) + amount
+        b = (rgb & 0xFF) + amount
+        r = 255 if r > 255 else r
+        g = 255 if g > 255 else g
+        b = 255 if b > 255 else b
+        return f"#{(r << 16) | (g << 8) | b:06x}"
+    except ValueError:
+        return color
+
+
 class AnimationManager:
     """Manages animations for widgets."""
     
@@ -231,18 +255,23 @@ class AnimatedButton(ctk.CTkButton):
         
         self.hover_scale = hover_scale
         self.original_fg_color = kwargs.get('fg_color', '#2d7a3e')
+        self._hover_color = None
+        if self.original_fg_color and self.original_fg_color != "transparent":
+            try:
+                self._hover_color = self._lighten_color(self.original_fg_color, 20)
+            except (AttributeError, ValueError):
+                pass
         
         self.bind("<Enter>", self._on_enter)
         self.bind("<Leave>", self._on_leave)
     
     def _on_enter(self, event):
         """Handle mouse enter."""
-        # Lighten color on hover
+        # Lighten color on hover (computed once in __init__)
         try:
-            if self.original_fg_color and self.original_fg_color != "transparent":
-                lighter = self._lighten_color(self.original_fg_color, 20)
-                self.configure(fg_color=lighter)
-        except (tk.TclError, AttributeError, ValueError):
+            if self._hover_color:
+                self.configure(fg_color=self._hover_color)
+        except (tk.TclError, AttributeError):
             pass
     
     def _on_leave(self, event):
@@ -257,13 +286,7 @@ class AnimatedButton(ctk.CTkButton):
         if not color.startswith('#'):
             return color
         
-        try:
-            r = min(255, int(color[1:3], 16) + amount)
-            g = min(255, int(color[3:5], 16) + amount)
-            b = min(255, int(color[5:7], 16) + amount)
-            return f"#{r:02x}{g:02x}{b:02x}"
-        except:
-            return color
+        return _lighten_hex(color, amount)
 
 
 class AnimatedCard(ctk.CTkFrame):
@@ -321,13 +344,7 @@ class AnimatedCard(ctk.CTkFrame):
     def _lighten_color(self, color: str, amount: int) -> str:
         if not color or not color.startswith('#'):
             return color or '#252540'
-        try:
-            r = min(255, int(color[1:3], 16) + amount)
-            g = min(255, int(color[3:5], 16) + amount)
-            b = min(255, int(color[5:7], 16) + amount)
-            return f"#{r:02x}{g:02x}{b:02x}"
-        except:
-            return color
+        return _lighten_hex(color, amount)
 
 
 class ScoreAnimation:
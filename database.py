@@ -5,6 +5,7 @@ SQLite database for persistent storage of players, matches, and statistics.
 
 import sqlite3
 from datetime import datetime
+from pathlib import Path
 from typing import Optional, List
 from dataclasses import dataclass, field
 import json
@@ -156,6 +157,9 @@ class Game:
 
 
 class DatabaseManager:
+    # Tables a file must contain to be accepted by restore_from
+    BACKUP_REQUIRED_TABLES = ('players', 'league_nights', 'matches')
+    
     def __init__(self, db_path: str = "ecopool_league.db"):
         self.db_path = db_path
         self.conn = None
@@ -165,8 +169,71 @@ class DatabaseManager:
         if self.conn is None:
             self.conn = sqlite3.connect(self.db_path)
             self.conn.row_factory = sqlite3.Row
+            self._configure_connection(self.conn)
         return self.conn
     
+    def _configure_connection(self, conn: sqlite3.Connection):
+        """Apply per-connection PRAGMAs.
+        
+        WAL with synchronous=NORMAL makes each commit a single append to
+        the -wal file instead of two fsyncs of the main database; only the
+        last transaction can be lost on power failure, never corrupted.
+        Applied on every new connection (each web server thread opens its own).
+        """
+        try:
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if str(mode).lower() != "wal":
+                _db_logger.warning(f"Could not enable WAL journal mode (using {mode})")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-64000")
+        except sqlite3.Error as e:
+            _db_logger.warning(f"Failed to configure database connection: {e}")
+    
+    def backup_to(self, path: str):
+        """Write a consistent copy of the database to path.
+        
+        Uses SQLite's online backup API, so commits still in the WAL are
+        included; copying the .db file directly would miss them.
+        """
+        dest = sqlite3.connect(path)
+        try:
+            self.get_connection().backup(dest)
+            # Leave the backup as a single self-contained file
+            dest.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dest.close()
+    
+    def restore_from(self, path: str):
+        """Replace the database contents with those of the backup at path.
+        
+        The pages are copied through the open connection in one transaction,
+        so the WAL and other connections stay consistent.
+        
+        Raises:
+            ValueError: If the file is missing or is not an EcoPOOL database
+                (SQLite accepts empty or unrelated files as valid databases);
+                the live database is left untouched.
+        """
+        if not Path(path).is_file():
+            raise ValueError(f"Backup file not found: {path}")
+        
+        # Read-only so a bad path never creates or modifies a file
+        source = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            try:
+                tables = {row[0] for row in source.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table'")}
+            except sqlite3.DatabaseError:
+                tables = set()
+            missing = [t for t in self.BACKUP_REQUIRED_TABLES if t not in tables]
+            if missing:
+                raise ValueError(
+                    f"Not an EcoPOOL database backup (missing tables: {', '.join(missing)})")
+            source.backup(self.get_connection())
+        finally:
+            source.close()
+    
     def init_database(self):
         """Initialize database tables."""
         conn = self.get_connection()
@@ -4,14 +4,36 @@ Handles pair assignment and full evening schedule generation with queue system.
 """
 
 import random
+from collections import deque
 from typing import Optional, List, Tuple
-from itertools import combinations, permutations
+from itertools import combinations
 from database import DatabaseManager, Player
 
+try:
+    import networkx as nx
+    NETWORKX_AVAILABLE = True
+except ImportError:
+    NETWORKX_AVAILABLE = False
+
 
 class MatchGenerator:
     def __init__(self, db: DatabaseManager):
         self.db = db
+        # Historical matchup counts, reused across regenerations until a
+        # caller records new matches and invalidates them.
+        self._matchup_counts_cache: Optional[dict] = None
+        self._matchup_counts_dirty = True
+
+    def _matchup_counts(self) -> dict:
+        """Get historical matchup counts, scanning match history only when stale."""
+        if self._matchup_counts_dirty:
+            self._matchup_counts_cache = self.db.get_matchup_counts()
+            self._matchup_counts_dirty = False
+        return self._matchup_counts_cache
+
+    def invalidate_matchup_counts(self):
+        """Mark cached matchup counts stale (call after creating matches)."""
+        self._matchup_counts_dirty = True
 
     def _normalize_team(self, team: tuple[int, Optional[int]]) -> tuple:
         """Normalize a team tuple to a sorted tuple for comparison."""
@@ -22,6 +44,17 @@ class MatchGenerator:
         """Create a normalized matchup key for comparison."""
         return frozenset([self._normalize_team(team1), self._normalize_team(team2)])
 
+    def _build_seen_opponents(self, matchup_counts: dict) -> dict:
+        """Map each normalized team to the set of teams it has already faced."""
+        seen_by_team = {}
+        for matchup_key, count in matchup_counts.items():
+            if count <= 0 or len(matchup_key) != 2:
+                continue
+            team_a, team_b = matchup_key
+            seen_by_team.setdefault(team_a, set()).add(team_b)
+            seen_by_team.setdefault(team_b, set()).add(team_a)
+        return seen_by_team
+
     # ============ Pair Generation Methods ============
 
     def generate_random_pairs(self, player_ids: list[int],
@@ -129,11 +162,11 @@ class MatchGenerator:
 
         pairs = []
         repeat_pairs = []
-        sorted_ids = [p[0] for p in players_with_stats]
+        sorted_ids = deque(p[0] for p in players_with_stats)
 
         while len(sorted_ids) >= 2:
             # Take best player
-            best = sorted_ids.pop(0)
+            best = sorted_ids.popleft()
 
             # Find the worst player that best hasn't been paired with
             # (or least paired with if all have been paired)
@@ -152,7 +185,11 @@ class MatchGenerator:
                     if count == 0:
                         break  # Found someone never paired with
 
-            worst = sorted_ids.pop(best_partner_idx)
+            if best_partner_idx == len(sorted_ids) - 1:
+                worst = sorted_ids.pop()
+            else:
+                worst = sorted_ids[best_partner_idx]
+                del sorted_ids[best_partner_idx]
             pairs.append((best, worst))
 
             if best_count > 0:
@@ -176,7 +213,7 @@ class MatchGenerator:
 
     def _build_best_round(self, pairs, games_per_pair, last_round_played,
                           current_round_num, max_matches, min_games_per_pair,
-                          matchup_counts, tonight_matchups, total_matchups_used):
+                          matchup_cost):
         """
         Find the best complete round by evaluating all valid non-conflicting
         combinations of matchups (backtracking search).
@@ -188,24 +225,16 @@ class MatchGenerator:
         """
         n_pairs = len(pairs)
 
-        def score_matchup(i, j):
-            pair1, pair2 = pairs[i], pairs[j]
-            matchup_key = self._create_matchup_key(pair1, pair2)
-            historical = matchup_counts.get(matchup_key, 0)
-            tonight = tonight_matchups.get(matchup_key, 0)
-            need = ((min_games_per_pair - games_per_pair[i]) +
-                    (min_games_per_pair - games_per_pair[j]))
-            idle = ((current_round_num - last_round_played[i]) +
-                    (current_round_num - last_round_played[j]))
-            # Large penalty for repeating a tonight matchup, but don't exclude
-            # outright – the algorithm must still be able to fill complete rounds.
-            repeat_penalty = 10000 if (i, j) in total_matchups_used else 0
-            return historical + (tonight * 10) + repeat_penalty - need - (idle * 5)
+        # Per-pair terms are computed once per round; each matchup score is
+        # then a handful of list lookups instead of a key build + dict probes.
+        need = [min_games_per_pair - games for games in games_per_pair]
+        idle = [current_round_num - last for last in last_round_played]
 
         # Sort all possible matchups: best (lowest) score first so backtracking
         # explores the most promising combinations early.
         all_scored = sorted(
-            [(i, j, score_matchup(i, j))
+            [(i, j,
+              matchup_cost[i][j] - need[i] - need[j] - (idle[i] + idle[j]) * 5)
              for i in range(n_pairs) for j in range(i + 1, n_pairs)],
             key=lambda x: x[2]
         )
@@ -246,6 +275,47 @@ class MatchGenerator:
         backtrack(0, [], set(), 0)
         return best_round
 
+    def _circle_method_rounds(self, pairs, min_games_per_pair):
+        """
+        Build rounds with the round-robin circle method: pair 0 stays fixed
+        while the rest rotate, so each cycle of rounds meets every opponent
+        exactly once.  An odd pair count gets a phantom opponent (a bye).
+
+        Cycles repeat until every pair has min_games_per_pair games.  The
+        fixed labeling ignores matchup history, so callers only use this
+        when there is none.
+        """
+        n_pairs = len(pairs)
+        n_slots = n_pairs + (n_pairs % 2)
+        rotating = n_slots - 1
+
+        cycle = []
+        for k in range(rotating):
+            round_matches = [(0, k + 1)]
+            for i in range(1, n_slots // 2):
+                a = (k - i) % rotating + 1
+                b = (k + i) % rotating + 1
+                round_matches.append((min(a, b), max(a, b)))
+            # Drop the bye match for odd pair counts
+            round_matches = [(i, j) for i, j in round_matches if j < n_pairs]
+            cycle.append(round_matches)
+
+        rounds = []
+        games = [0] * n_pairs
+        below = n_pairs if min_games_per_pair > 0 else 0
+        while below > 0:
+            round_matches = cycle[len(rounds) % rotating]
+            for i, j in round_matches:
+                games[i] += 1
+                games[j] += 1
+                if games[i] == min_games_per_pair:
+                    below -= 1
+                if games[j] == min_games_per_pair:
+                    below -= 1
+            rounds.append(round_matches)
+
+        return rounds
+
     def generate_full_schedule(self, pairs: list[tuple[int, Optional[int]]],
                                min_games_per_pair: int = 4,
                                table_count: int = 3,
@@ -277,23 +347,53 @@ class MatchGenerator:
             }
 
         # Get historical matchup counts if avoiding repeats
-        matchup_counts = self.db.get_matchup_counts() if avoid_repeats else {}
-
-        # Generate all possible pair vs pair matchups
-        all_matchups = list(combinations(range(len(pairs)), 2))
+        matchup_counts = self._matchup_counts() if avoid_repeats else {}
+
+        # Static part of each matchup's score as a pair-by-pair matrix: the
+        # historical count, plus tonight's repeat penalties added in place as
+        # rounds are scheduled. Built once, so rounds never rebuild keys.
+        # Normalize each pair once; matchup keys below are built from these.
+        normalized = [self._normalize_team(pair) for pair in pairs]
+        count_of = matchup_counts.get
+
+        matchup_cost = [[0] * len(pairs) for _ in range(len(pairs))]
+        if matchup_counts:
+            for p1_idx, p2_idx in combinations(range(len(pairs)), 2):
+                count = count_of(
+                    frozenset((normalized[p1_idx], normalized[p2_idx])), 0)
+                matchup_cost[p1_idx][p2_idx] = count
+                matchup_cost[p2_idx][p1_idx] = count
 
         # Count how many games each pair has been assigned
-        games_per_pair = {i: 0 for i in range(len(pairs))}
-        tonight_matchups = {}  # Track tonight's matchups to avoid too many repeats
+        # Flat per-index lists: pair indices are dense small ints, so these
+        # avoid dict hashing in the round loop.
+        games_per_pair = [0] * len(pairs)
+        # Track tonight's matchups (symmetric matrix) to avoid too many repeats
+        tonight_matchups = [[0] * len(pairs) for _ in range(len(pairs))]
 
         # Generate rounds - each round ensures no pair plays twice
         rounds = []
-        total_matchups_used = set()
         # Track when each pair last played to minimize idle time
-        last_round_played = {i: 0 for i in range(len(pairs))}
+        last_round_played = [0] * len(pairs)
         current_round_num = 0
 
-        while min(games_per_pair.values()) < min_games_per_pair:
+        # When every pair can be at a table at once, a round-robin circle
+        # schedule gives balanced rounds with no repeats tonight. Its pair
+        # labeling is fixed and ignores history, so it is only used when
+        # there is no history to avoid; otherwise the history-aware round
+        # builder below schedules every round.
+        if avoid_repeats and table_count >= len(pairs) // 2 and not matchup_counts:
+            rounds = self._circle_method_rounds(pairs, min_games_per_pair)
+            for round_matches in rounds:
+                for p1_idx, p2_idx in round_matches:
+                    games_per_pair[p1_idx] += 1
+                    games_per_pair[p2_idx] += 1
+
+        # Pairs still short of min_games_per_pair; decremented as each pair
+        # reaches the target so the loop test doesn't rescan every pair.
+        below = sum(1 for games in games_per_pair if games < min_games_per_pair)
+
+        while below > 0:
             current_round_num += 1
             max_matches_in_round = min(table_count, len(pairs) // 2)
 
@@ -303,7 +403,7 @@ class MatchGenerator:
             round_matches = self._build_best_round(
                 pairs, games_per_pair, last_round_played,
                 current_round_num, max_matches_in_round, min_games_per_pair,
-                matchup_counts, tonight_matchups, total_matchups_used
+                matchup_cost
             )
 
             if not round_matches:
@@ -311,20 +411,27 @@ class MatchGenerator:
 
             # Update tracking state
             for p1_idx, p2_idx in round_matches:
-                total_matchups_used.add((p1_idx, p2_idx))
                 games_per_pair[p1_idx] += 1
                 games_per_pair[p2_idx] += 1
-                pair1 = pairs[p1_idx]
-                pair2 = pairs[p2_idx]
-                matchup_key = self._create_matchup_key(pair1, pair2)
-                tonight_matchups[matchup_key] = tonight_matchups.get(matchup_key, 0) + 1
+                if games_per_pair[p1_idx] == min_games_per_pair:
+                    below -= 1
+                if games_per_pair[p2_idx] == min_games_per_pair:
+                    below -= 1
+                # Large penalty for repeating a tonight matchup, but don't
+                # exclude outright – the algorithm must still be able to fill
+                # complete rounds. Each further repeat adds another 10.
+                penalty = 10 if tonight_matchups[p1_idx][p2_idx] else 10010
+                matchup_cost[p1_idx][p2_idx] += penalty
+                matchup_cost[p2_idx][p1_idx] += penalty
+                tonight_matchups[p1_idx][p2_idx] += 1
+                tonight_matchups[p2_idx][p1_idx] += 1
                 last_round_played[p1_idx] = current_round_num
                 last_round_played[p2_idx] = current_round_num
 
             rounds.append(round_matches)
 
         # Post-process: remove matches where both pairs already have enough games
-        trimmed_games = {i: 0 for i in range(len(pairs))}
+        trimmed_games = [0] * len(pairs)
         trimmed_rounds = []
         for round_matches in rounds:
             trimmed_round = []
@@ -338,19 +445,24 @@ class MatchGenerator:
                 trimmed_rounds.append(trimmed_round)
         rounds = trimmed_rounds
 
-        # Create match data with round numbers
+        # Create match data with round numbers, bucketing each match into
+        # live/queued and its round summary in the same pass
         matches = []
+        live_matches = []
+        queued_matches = []
+        round_summaries = []
         queue_position = 0
 
         for round_num, round_matches in enumerate(rounds, start=1):
+            round_matches_list = []
             for p1_idx, p2_idx in round_matches:
                 pair1 = pairs[p1_idx]
                 pair2 = pairs[p2_idx]
 
-                matchup_key = self._create_matchup_key(pair1, pair2)
-                historical_count = matchup_counts.get(matchup_key, 0)
+                historical_count = count_of(
+                    frozenset((normalized[p1_idx], normalized[p2_idx])), 0)
 
-                matches.append({
+                match = {
                     'pair1_idx': p1_idx,
                     'pair2_idx': p2_idx,
                     'pair1': pair1,
@@ -361,25 +473,21 @@ class MatchGenerator:
                     'repeat_count': historical_count,
                     'status': 'queued',
                     'table_number': None
-                })
+                }
                 queue_position += 1
 
-        # Initial live matches are from round 1
-        round1_matches = [m for m in matches if m['round_number'] == 1]
-        live_matches = round1_matches[:table_count]
+                # Initial live matches are from round 1, one per table;
+                # all other matches start as queued
+                if round_num == 1 and len(live_matches) < table_count:
+                    match['status'] = 'live'
+                    match['table_number'] = len(live_matches) + 1
+                    live_matches.append(match)
+                else:
+                    queued_matches.append(match)
 
-        # Assign table numbers to initial live matches
-        for i, match in enumerate(live_matches):
-            match['table_number'] = i + 1
-            match['status'] = 'live'
+                matches.append(match)
+                round_matches_list.append(match)
 
-        # All other matches start as queued
-        queued_matches = [m for m in matches if m['status'] == 'queued']
-
-        # Build round summaries
-        round_summaries = []
-        for round_num in range(1, len(rounds) + 1):
-            round_matches_list = [m for m in matches if m['round_number'] == round_num]
             round_summaries.append({
                 'round_number': round_num,
                 'matches': round_matches_list,
@@ -462,7 +570,7 @@ class MatchGenerator:
         if len(teams) < 2:
             return []
 
-        matchup_counts = self.db.get_matchup_counts() if avoid_repeats else {}
+        matchup_counts = self._matchup_counts() if avoid_repeats else {}
 
         matches = []
         available_teams = teams.copy()
@@ -509,11 +617,59 @@ class MatchGenerator:
         if n_teams < 2:
             return []
 
+        if NETWORKX_AVAILABLE:
+            return self._weighted_best_pairings(teams, matchup_counts)
+
         if n_teams <= 8:
             return self._exhaustive_best_pairings(teams, matchup_counts)
 
         return self._greedy_best_pairings(teams, matchup_counts)
 
+    def _weighted_best_pairings(self, teams: list[tuple[int, Optional[int]]],
+                                matchup_counts: dict) -> list[tuple]:
+        """
+        Find optimal pairings for any team count via weighted graph matching
+        (Edmonds' blossom algorithm), minimizing total repeat matchups.
+        """
+        teams_list = list(teams)
+        make_key = self._create_matchup_key
+        count_of = matchup_counts.get
+        counts = {
+            (i, j): count_of(make_key(teams_list[i], teams_list[j]), 0)
+            for i, j in combinations(range(len(teams_list)), 2)
+        }
+
+        # Max-cardinality matching always pairs the same number of teams, so
+        # maximizing (ceiling - count) minimizes the total repeat count.
+        ceiling = max(counts.values(), default=0) + 1
+        graph = nx.Graph()
+        for (i, j), count in counts.items():
+            graph.add_edge(i, j, weight=ceiling - count)
+
+        matching = nx.max_weight_matching(graph, maxcardinality=True)
+        return [(teams_list[min(i, j)], teams_list[max(i, j)])
+                for i, j in sorted(matching, key=min)]
+
+    def _iter_matchings(self, indices: list[int]):
+        """
+        Yield every way to split indices into (low, high) pairs exactly once.
+        With an odd count, each index in turn is left out as the bye.
+        """
+        if len(indices) < 2:
+            yield []
+            return
+
+        if len(indices) % 2:
+            for skip in range(len(indices)):
+                yield from self._iter_matchings(indices[:skip] + indices[skip + 1:])
+            return
+
+        first = indices[0]
+        for k in range(1, len(indices)):
+            rest = indices[1:k] + indices[k + 1:]
+            for matching in self._iter_matchings(rest):
+                yield [(first, indices[k])] + matching
+
     def _exhaustive_best_pairings(self, teams: list[tuple[int, Optional[int]]],
                                    matchup_counts: dict) -> list[tuple]:
         """Find optimal pairings by checking all possible arrangements."""
@@ -521,31 +677,23 @@ class MatchGenerator:
         best_score = float('inf')
 
         teams_list = list(teams)
-        seen_configs = set()
-
-        for perm in permutations(range(len(teams_list))):
-            pairings = []
-            for i in range(0, len(perm) - 1, 2):
-                t1_idx, t2_idx = perm[i], perm[i + 1]
-                pair = tuple(sorted([t1_idx, t2_idx]))
-                pairings.append(pair)
-
-            config_key = frozenset(pairings)
-            if config_key in seen_configs:
-                continue
-            seen_configs.add(config_key)
+        make_key = self._create_matchup_key
+        count_of = matchup_counts.get
+
+        # Repeat count of every index pair, looked up once rather than once
+        # per matching that contains it
+        repeat_counts = {
+            (i, j): count_of(make_key(teams_list[i], teams_list[j]), 0)
+            for i, j in combinations(range(len(teams_list)), 2)
+        }
 
-            score = 0
-            actual_pairings = []
-            for t1_idx, t2_idx in pairings:
-                team1, team2 = teams_list[t1_idx], teams_list[t2_idx]
-                matchup_key = self._create_matchup_key(team1, team2)
-                score += matchup_counts.get(matchup_key, 0)
-                actual_pairings.append((team1, team2))
+        for pairings in self._iter_matchings(list(range(len(teams_list)))):
+            score = sum([repeat_counts[pair] for pair in pairings])
 
             if score < best_score:
                 best_score = score
-                best_pairings = actual_pairings
+                best_pairings = [(teams_list[t1_idx], teams_list[t2_idx])
+                                 for t1_idx, t2_idx in pairings]
 
                 if score == 0:
                     break
@@ -559,24 +707,40 @@ class MatchGenerator:
         random.shuffle(available)
         pairings = []
 
-        while len(available) >= 2:
-            team1 = available.pop(0)
+        normalized = {team: self._normalize_team(team) for team in available}
+        seen_by_team = self._build_seen_opponents(matchup_counts)
+        make_key = self._create_matchup_key
+        count_of = matchup_counts.get
 
-            best_opponent_idx = 0
-            best_repeat_count = float('inf')
+        # The list is shuffled, so taking from the tail is as random as the
+        # head and keeps every removal O(1).
+        while len(available) >= 2:
+            team1 = available.pop()
+            blocked = seen_by_team.get(normalized[team1], ())
 
+            # Fast path: any opponent team1 has never faced is a best choice
+            best_opponent_idx = None
             for i, team2 in enumerate(available):
-                matchup_key = self._create_matchup_key(team1, team2)
-                repeat_count = matchup_counts.get(matchup_key, 0)
-
-                if repeat_count < best_repeat_count:
-                    best_repeat_count = repeat_count
+                if normalized[team2] not in blocked:
                     best_opponent_idx = i
+                    break
+
+            if best_opponent_idx is None:
+                # Every remaining opponent is a repeat - take the least repeated
+                best_opponent_idx = 0
+                best_repeat_count = float('inf')
 
-                    if repeat_count == 0:
-                        break
+                for i, team2 in enumerate(available):
+                    repeat_count = count_of(make_key(team1, team2), 0)
 
-            team2 = available.pop(best_opponent_idx)
+                    if repeat_count < best_repeat_count:
+                        best_repeat_count = repeat_count
+                        best_opponent_idx = i
+
+            # Swap-and-pop: order of the remaining teams doesn't matter
+            team2 = available[best_opponent_idx]
+            available[best_opponent_idx] = available[-1]
+            available.pop()
             pairings.append((team1, team2))
 
         return pairings
@@ -686,7 +850,7 @@ class MatchGenerator:
         if len(player_ids) < 2:
             return {'rounds': [], 'total_rounds': 0, 'games_per_player': {}}
 
-        historical_counts = self.db.get_matchup_counts() if avoid_repeats else {}
+        historical_counts = self._matchup_counts() if avoid_repeats else {}
         tonight_matchups = {}
         num_rounds = max(min_games_per_player, 1)
 
@@ -777,7 +941,9 @@ class MatchGenerator:
         if len(teams) < 2:
             return []
 
-        if len(teams) <= 8:
+        if NETWORKX_AVAILABLE:
+            best_pairings = self._weighted_best_pairings(teams, matchup_counts)
+        elif len(teams) <= 8:
             best_pairings = self._exhaustive_best_pairings_with_counts(teams, matchup_counts)
         else:
             best_pairings = self._greedy_best_pairings_with_counts(teams, matchup_counts)
@@ -804,31 +970,23 @@ class MatchGenerator:
         best_score = float('inf')
 
         teams_list = list(teams)
-        seen_configs = set()
-
-        for perm in permutations(range(len(teams_list))):
-            pairings = []
-            for i in range(0, len(perm) - 1, 2):
-                t1_idx, t2_idx = perm[i], perm[i + 1]
-                pair = tuple(sorted([t1_idx, t2_idx]))
-                pairings.append(pair)
-
-            config_key = frozenset(pairings)
-            if config_key in seen_configs:
-                continue
-            seen_configs.add(config_key)
+        make_key = self._create_matchup_key
+        count_of = matchup_counts.get
+
+        # Repeat count of every index pair, looked up once rather than once
+        # per matching that contains it
+        repeat_counts = {
+            (i, j): count_of(make_key(teams_list[i], teams_list[j]), 0)
+            for i, j in combinations(range(len(teams_list)), 2)
+        }
 
-            score = 0
-            actual_pairings = []
-            for t1_idx, t2_idx in pairings:
-                team1, team2 = teams_list[t1_idx], teams_list[t2_idx]
-                matchup_key = self._create_matchup_key(team1, team2)
-                score += matchup_counts.get(matchup_key, 0)
-                actual_pairings.append((team1, team2))
+        for pairings in self._iter_matchings(list(range(len(teams_list)))):
+            score = sum([repeat_counts[pair] for pair in pairings])
 
             if score < best_score:
                 best_score = score
-                best_pairings = actual_pairings
+                best_pairings = [(teams_list[t1_idx], teams_list[t2_idx])
+                                 for t1_idx, t2_idx in pairings]
                 if score == 0:
                     break
 
@@ -841,23 +999,40 @@ class MatchGenerator:
         random.shuffle(available)
         pairings = []
 
-        while len(available) >= 2:
-            team1 = available.pop(0)
+        normalized = {team: self._normalize_team(team) for team in available}
+        seen_by_team = self._build_seen_opponents(matchup_counts)
+        make_key = self._create_matchup_key
+        count_of = matchup_counts.get
 
-            best_opponent_idx = 0
-            best_repeat_count = float('inf')
+        # The list is shuffled, so taking from the tail is as random as the
+        # head and keeps every removal O(1).
+        while len(available) >= 2:
+            team1 = available.pop()
+            blocked = seen_by_team.get(normalized[team1], ())
 
+            # Fast path: any opponent team1 has never faced is a best choice
+            best_opponent_idx = None
             for i, team2 in enumerate(available):
-                matchup_key = self._create_matchup_key(team1, team2)
-                repeat_count = matchup_counts.get(matchup_key, 0)
-
-                if repeat_count < best_repeat_count:
-                    best_repeat_count = repeat_count
+                if normalized[team2] not in blocked:
                     best_opponent_idx = i
-                    if repeat_count == 0:
-                        break
+                    break
+
+            if best_opponent_idx is None:
+                # Every remaining opponent is a repeat - take the least repeated
+                best_opponent_idx = 0
+                best_repeat_count = float('inf')
+
+                for i, team2 in enumerate(available):
+                    repeat_count = count_of(make_key(team1, team2), 0)
+
+                    if repeat_count < best_repeat_count:
+                        best_repeat_count = repeat_count
+                        best_opponent_idx = i
 
-            team2 = available.pop(best_opponent_idx)
+            # Swap-and-pop: order of the remaining teams doesn't matter
+            team2 = available[best_opponent_idx]
+            available[best_opponent_idx] = available[-1]
+            available.pop()
             pairings.append((team1, team2))
 
         return pairings
@@ -6,33 +6,109 @@ import signal
 import tempfile
 from typing import Optional, Tuple
 
+try:
+    from pyngrok import ngrok, conf
+    PYNGROK_AVAILABLE = True
+except ImportError:
+    PYNGROK_AVAILABLE = False
+
 _tunnel = None
 _public_url = None
 _config_file = None
+# True when _config_file is a one-off mkstemp file that must be deleted
+_config_file_is_temp = False
+# Set once the installed agent has refused a config with pooling_enabled
+_pooling_unsupported = False
+# (config, auth token) the running ngrok agent was started with; None if
+# there is no agent that can be reused
+_agent_key = None
 _cleanup_registered = False
-_original_sigint = None
-_original_sigterm = None
 
 
 def _cleanup_on_exit():
     """Cleanup handler called on program exit."""
-    stop_tunnel()
+    stop_tunnel(kill_agent=True)
 
 
 def _signal_handler(signum, frame):
-    """Handle SIGINT/SIGTERM for clean shutdown."""
-    stop_tunnel()
-    # Call original handler if it exists
-    if signum == signal.SIGINT and _original_sigint:
-        if callable(_original_sigint):
-            _original_sigint(signum, frame)
-        elif _original_sigint == signal.SIG_DFL:
-            sys.exit(0)
-    elif signum == signal.SIGTERM and _original_sigterm:
-        if callable(_original_sigterm):
-            _original_sigterm(signum, frame)
-        elif _original_sigterm == signal.SIG_DFL:
-            sys.exit(0)
+    """Handle SIGINT/SIGTERM by exiting, which runs the atexit cleanup.
+
+    No cleanup happens here: stopping the tunnel in signal context could
+    deadlock, and sys.exit lets Python unwind and run _cleanup_on_exit.
+    """
+    sys.exit(128 + signum)
+
+
+def _config_dir() -> Optional[str]:
+    """Return a per-user directory for the cached ngrok config.
+
+    Returns None if the directory can't be created or isn't private to the
+    current user, in which case callers fall back to a mkstemp file.
+    """
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+        path = os.path.join(base, 'EcoPOOL')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        path = os.path.join(base, 'ecopool')
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        if hasattr(os, 'getuid'):
+            st = os.lstat(path)
+            if st.st_uid != os.getuid() or st.st_mode & 0o022:
+                return None
+    except OSError:
+        return None
+    return path
+
+
+def _write_config_if_changed(config_path: str, config_content: str):
+    """Write the ngrok config file, skipping the write if it is already current."""
+    try:
+        with open(config_path, 'r') as f:
+            if f.read() == config_content:
+                return
+    except OSError:
+        pass
+
+    # Owner-only permissions; never follow a symlink planted at the path
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_NOFOLLOW', 0)
+    config_fd = os.open(config_path, flags, 0o600)
+    with os.fdopen(config_fd, 'w') as f:
+        f.write(config_content)
+
+
+def _write_config(port: int, config_content: str) -> Tuple[str, bool]:
+    """Write the tunnel config and return (path, is_temp).
+
+    The config is cached per port in the user's own config directory so
+    restarts reuse it. If that isn't usable, a private mkstemp file is
+    written instead and must be deleted by the caller when done.
+    """
+    config_dir = _config_dir()
+    if config_dir:
+        config_path = os.path.join(config_dir, f"ngrok_{port}.yml")
+        try:
+            _write_config_if_changed(config_path, config_content)
+            return config_path, False
+        except OSError:
+            pass
+
+    config_fd, config_path = tempfile.mkstemp(suffix='.yml', prefix='ngrok_config_')
+    with os.fdopen(config_fd, 'w') as f:
+        f.write(config_content)
+    return config_path, True
+
+
+def _remove_temp_config():
+    """Delete the current config file if it was a one-off mkstemp file."""
+    global _config_file_is_temp
+    if _config_file_is_temp and _config_file:
+        try:
+            os.unlink(_config_file)
+        except OSError:
+            pass
+    _config_file_is_temp = False
 
 
 def start_tunnel(port: int, auth_token: Optional[str] = None,
@@ -49,7 +125,10 @@ def start_tunnel(port: int, auth_token: Optional[str] = None,
         Tuple of (success, public_url or error message)
     """
     global _tunnel, _public_url, _config_file, _cleanup_registered
-    global _original_sigint, _original_sigterm
+    global _agent_key, _config_file_is_temp, _pooling_unsupported
+
+    if not PYNGROK_AVAILABLE:
+        return False, "pyngrok not installed. Run: pip install pyngrok"
 
     # Register cleanup handlers on first use
     if not _cleanup_registered:
@@ -57,22 +136,20 @@ def start_tunnel(port: int, auth_token: Optional[str] = None,
 
         # Register signal handlers for clean shutdown (Windows-safe)
         try:
-            _original_sigint = signal.signal(signal.SIGINT, _signal_handler)
+            signal.signal(signal.SIGINT, _signal_handler)
         except (ValueError, OSError):
             pass  # Signal handling not available in this context
 
         try:
             # SIGTERM not available on Windows
             if hasattr(signal, 'SIGTERM'):
-                _original_sigterm = signal.signal(signal.SIGTERM, _signal_handler)
+                signal.signal(signal.SIGTERM, _signal_handler)
         except (ValueError, OSError):
             pass
 
         _cleanup_registered = True
 
     try:
-        from pyngrok import ngrok, conf
-
         # Clean up static domain format if provided
         if static_domain:
             static_domain = static_domain.strip()
@@ -93,6 +170,7 @@ def start_tunnel(port: int, auth_token: Optional[str] = None,
 
         # Create ngrok config file - works for both static domain and regular tunnels
         # Using config file is more reliable than passing parameters directly
+        use_pooling = False
         if static_domain:
             # Config with static domain (eliminates browser warning completely)
             config_content = f"""version: "2"
@@ -102,24 +180,39 @@ tunnels:
     addr: {port}
     domain: {static_domain}
 """
+            # Pooling lets a reconnect come up while the previous session on
+            # the domain is still being torn down, instead of being rejected.
+            # Older agents reject the key, so it is dropped once that happens.
+            if not _pooling_unsupported:
+                use_pooling = True
+                config_content += "    pooling_enabled: true\n"
         else:
-            # Config without static domain - use header to reduce warning
+            # Config without static domain. The browser warning can only be
+            # skipped by the visitor's request (or a static domain), so no
+            # request header rewriting is configured on the tunnel.
             config_content = f"""version: "2"
 tunnels:
   ecopool:
     proto: http
     addr: {port}
-    request_header:
-      add:
-        - "ngrok-skip-browser-warning: true"
 """
 
-        # Create temporary config file
-        config_fd, config_path = tempfile.mkstemp(suffix='.yml', prefix='ngrok_config_')
-        try:
-            with os.fdopen(config_fd, 'w') as f:
-                f.write(config_content)
+        agent_key = (config_content, auth_token)
+        if _agent_key == agent_key:
+            # The agent is already running with these settings; a tunnel that
+            # is still up can be returned as-is, otherwise reconnect through
+            # the same agent without restarting it
+            if _tunnel is not None and _tunnel_is_live():
+                return True, _public_url
+        else:
+            # Settings changed (or no agent yet); restart so they're loaded
+            ngrok.kill()
+            _tunnel = None
+            _agent_key = None
 
+        try:
+            _remove_temp_config()
+            config_path, _config_file_is_temp = _write_config(port, config_content)
             _config_file = config_path
 
             # Configure pyngrok to use this config file
@@ -133,6 +226,7 @@ tunnels:
             # Connect using the named tunnel from config
             _tunnel = ngrok.connect(name="ecopool")
             _public_url = _tunnel.public_url
+            _agent_key = agent_key
 
             # Debug: Print what URL we got vs what we expected
             if static_domain:
@@ -144,45 +238,69 @@ tunnels:
 
             return True, _public_url
         except Exception as config_error:
-            # If config file approach fails, fall back to simple connection
-            if os.path.exists(config_path):
-                try:
-                    os.unlink(config_path)
-                except Exception:
-                    pass
+            _remove_temp_config()
             _config_file = None
-            # Fallback: try simple connection without warning bypass
+
+            if use_pooling:
+                # Retry once without pooling before giving up on the domain
+                print(f"[ngrok] Tunnel with pooling_enabled failed ({config_error}); "
+                      "retrying without it.")
+                _pooling_unsupported = True
+                ngrok.kill()
+                _tunnel = None
+                _agent_key = None
+                return start_tunnel(port, auth_token, static_domain)
+
+            # If config file approach fails, fall back to simple connection
+            if static_domain:
+                print(f"[ngrok] WARNING: Could not start tunnel on static domain "
+                      f"{static_domain} ({config_error}); falling back to a random "
+                      "ngrok URL.")
+            # Fallback: try simple connection without the config file
             # Make sure auth_token is set for fallback too
             if auth_token:
                 conf.get_default().auth_token = auth_token
             _tunnel = ngrok.connect(port, "http")
             _public_url = _tunnel.public_url
             return True, _public_url
-    except ImportError:
-        return False, "pyngrok not installed. Run: pip install pyngrok"
     except Exception as e:
         return False, str(e)
 
 
-def stop_tunnel():
-    """Stop the ngrok tunnel if running."""
-    global _tunnel, _public_url, _config_file
+def _tunnel_is_live() -> bool:
+    """Check with the running agent that our tunnel is still open."""
     try:
-        from pyngrok import ngrok
-        if _tunnel:
-            ngrok.disconnect(_tunnel.public_url)
-        ngrok.kill()
+        return any(t.public_url == _public_url for t in ngrok.get_tunnels())
     except Exception:
-        pass
-    _tunnel = None
-    _public_url = None
-    
-    # Clean up temporary config file
-    if _config_file and os.path.exists(_config_file):
+        return False
+
+
+def stop_tunnel(kill_agent: bool = False):
+    """Stop the ngrok tunnel if running.
+
+    Args:
+        kill_agent: Also stop the ngrok agent process. By default it is left
+                    running so the next start_tunnel skips the agent launch
+                    and auth handshake; it is killed on program exit.
+    """
+    global _tunnel, _public_url, _config_file, _agent_key
+    if PYNGROK_AVAILABLE:
         try:
-            os.unlink(_config_file)
+            if _tunnel:
+                ngrok.disconnect(_tunnel.public_url)
         except Exception:
             pass
+        if kill_agent:
+            try:
+                ngrok.kill()
+            except Exception:
+                pass
+            _agent_key = None
+    _tunnel = None
+    _public_url = None
+    # A cached per-user config is kept for reuse by the next start_tunnel;
+    # a one-off temp file is not
+    _remove_temp_config()
     _config_file = None
 
 
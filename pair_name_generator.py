@@ -4,8 +4,12 @@ Generates creative pool-themed team names for player pairs using the Anthropic C
 Falls back to a curated list of names when the API is unavailable.
 """
 
+import logging
 import os
 import threading
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 try:
     import anthropic
@@ -13,7 +17,21 @@ try:
 except ImportError:
     ANTHROPIC_AVAILABLE = False
 
-FALLBACK_NAMES = [
+try:
+    from advanced_stats import AdvancedStatsManager
+    ADVANCED_STATS_AVAILABLE = True
+except ImportError:
+    ADVANCED_STATS_AVAILABLE = False
+
+_logger = logging.getLogger(__name__)
+
+# Name requests are network-bound, so pairs are named in parallel
+MAX_NAME_WORKERS = 8
+# Cap on in-flight Claude requests, kept under the API rate limit so a
+# batch doesn't trigger 429s and the SDK's backoff retries
+MAX_CONCURRENT_REQUESTS = 5
+
+FALLBACK_NAMES = (
     "The Scratch Artists",
     "Eight Ball Outlaws",
     "Rack 'Em Rangers",
@@ -29,7 +47,47 @@ FALLBACK_NAMES = [
     "The Miscue Maestros",
     "Rail Birds",
     "The Long Shots",
-]
+)
+_FALLBACK_N = len(FALLBACK_NAMES)
+
+_PROMPT_TEMPLATE = (
+    "You are naming a pool/billiards duo. Create ONE creative, funny, or intimidating "
+    "pool-themed team name for this pair. Maximum 4 words. Reply with the name only, "
+    "no explanation.\n\n"
+    "Player 1: {p1_desc}\n"
+    "Player 2: {p2_desc}"
+)
+
+
+@lru_cache(maxsize=256)
+def _describe_player(stats_items: tuple) -> str:
+    """Describe a player for the prompt, from a hashable tuple of stats items."""
+    stats = dict(stats_items)
+    form = stats.get("form_trend", "neutral")
+    streak_count = stats.get("streak_count", 0)
+    streak_type = stats.get("streak_type", "none")
+    golden = stats.get("golden_breaks", 0)
+    clutch = stats.get("clutch_rating", 0.0)
+    eight_ball = stats.get("eight_ball_sinks", 0)
+
+    parts = filter(None, (
+        f"form: {form}" if form != "neutral" else None,
+        f"{streak_count}-game {streak_type} streak"
+        if streak_count >= 2 and streak_type != "none" else None,
+        f"{golden} golden break{'s' if golden > 1 else ''}" if golden > 0 else None,
+        f"{stats.get('win_rate', 0.0):.0f}% win rate",
+        "clutch player" if clutch > 60 else
+        "struggles under pressure" if clutch < 40 else None,
+        f"{eight_ball} legal 8-ball win{'s' if eight_ball > 1 else ''}"
+        if eight_ball > 0 else None,
+        f"{stats.get('avg_points', 0.0):.1f} avg pts/game",
+    ))
+    return ", ".join(parts) or "new player"
+
+
+def _name_too_long(text: str) -> bool:
+    """Check a (possibly partial) reply against the name word/length limits."""
+    return len(text.split()) > 6 or len(text.strip().strip('"\'')) > 50
 
 
 class PairNameGenerator:
@@ -39,6 +97,19 @@ class PairNameGenerator:
         self.db = db
         self._client = None
         self._client_initialized = False
+        self._api_sem = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+        self._stats_mgr = None
+        if ADVANCED_STATS_AVAILABLE:
+            try:
+                self._stats_mgr = AdvancedStatsManager(db)
+            except Exception:
+                self._stats_mgr = None
+        # AI names already generated this session, keyed by frozenset of player IDs
+        self._name_cache = {}
+
+    def clear_name_cache(self):
+        """Forget generated names so the next batch asks Claude for new ones."""
+        self._name_cache.clear()
 
     def _get_client(self):
         """Lazily initialize the Anthropic client."""
@@ -63,42 +134,10 @@ class PairNameGenerator:
 
     def _build_prompt(self, p1_stats: dict, p2_stats: dict) -> str:
         """Build the Claude prompt from player stats."""
-        def describe_player(stats: dict) -> str:
-            parts = []
-            form = stats.get("form_trend", "neutral")
-            if form != "neutral":
-                parts.append(f"form: {form}")
-            streak_count = stats.get("streak_count", 0)
-            streak_type = stats.get("streak_type", "none")
-            if streak_count >= 2 and streak_type != "none":
-                parts.append(f"{streak_count}-game {streak_type} streak")
-            golden = stats.get("golden_breaks", 0)
-            if golden > 0:
-                parts.append(f"{golden} golden break{'s' if golden > 1 else ''}")
-            win_rate = stats.get("win_rate", 0.0)
-            parts.append(f"{win_rate:.0f}% win rate")
-            clutch = stats.get("clutch_rating", 0.0)
-            if clutch > 60:
-                parts.append("clutch player")
-            elif clutch < 40:
-                parts.append("struggles under pressure")
-            eight_ball = stats.get("eight_ball_sinks", 0)
-            if eight_ball > 0:
-                parts.append(f"{eight_ball} legal 8-ball win{'s' if eight_ball > 1 else ''}")
-            avg_pts = stats.get("avg_points", 0.0)
-            parts.append(f"{avg_pts:.1f} avg pts/game")
-            return ", ".join(parts) if parts else "new player"
-
-        p1_desc = describe_player(p1_stats)
-        p2_desc = describe_player(p2_stats)
-
-        return (
-            f"You are naming a pool/billiards duo. Create ONE creative, funny, or intimidating "
-            f"pool-themed team name for this pair. Maximum 4 words. Reply with the name only, "
-            f"no explanation.\n\n"
-            f"Player 1: {p1_desc}\n"
-            f"Player 2: {p2_desc}"
-        )
+        return _PROMPT_TEMPLATE.format_map({
+            "p1_desc": _describe_player(tuple(sorted(p1_stats.items()))),
+            "p2_desc": _describe_player(tuple(sorted(p2_stats.items()))),
+        })
 
     def _get_player_stats(self, player_id: int) -> dict:
         """Fetch combined stats for a player."""
@@ -120,8 +159,9 @@ class PairNameGenerator:
                 stats["eight_ball_sinks"] = player.eight_ball_sinks
                 stats["avg_points"] = player.avg_points
 
-            from advanced_stats import AdvancedStatsManager
-            mgr = AdvancedStatsManager(self.db)
+            mgr = self._stats_mgr
+            if mgr is None:
+                return stats
 
             streak = mgr.get_player_streak(player_id)
             if streak:
@@ -136,46 +176,104 @@ class PairNameGenerator:
             pass
         return stats
 
-    def generate_name_for_pair(self, player1_id: int, player2_id: int, pair_idx: int) -> str:
-        """Generate a name for a single pair. Returns fallback on any error."""
+    def _get_stats_for_pairs(self, pairs: list) -> dict:
+        """Fetch stats once per distinct player across all named pairs."""
+        player_ids = {pid for p1_id, p2_id in pairs if p2_id is not None
+                      for pid in (p1_id, p2_id)}
+        return {pid: self._get_player_stats(pid) for pid in player_ids}
+
+    def generate_name_for_pair(self, player1_id: int, player2_id: int, pair_idx: int,
+                               stats_cache: dict = None) -> str:
+        """Generate a name for a single pair. Returns fallback on any error.
+
+        stats_cache maps player ID to prefetched stats; missing players are
+        fetched from the database.
+        """
+        key = frozenset((player1_id, player2_id))
+        cached = self._name_cache.get(key)
+        if cached:
+            return cached
+
         try:
             client = self._get_client()
             if client is None:
-                return FALLBACK_NAMES[pair_idx % len(FALLBACK_NAMES)]
+                return FALLBACK_NAMES[pair_idx % _FALLBACK_N]
 
-            p1_stats = self._get_player_stats(player1_id)
-            p2_stats = self._get_player_stats(player2_id) if player2_id else {}
+            stats_cache = stats_cache or {}
+            p1_stats = stats_cache.get(player1_id) or self._get_player_stats(player1_id)
+            if player2_id:
+                p2_stats = stats_cache.get(player2_id) or self._get_player_stats(player2_id)
+            else:
+                p2_stats = {}
 
             prompt = self._build_prompt(p1_stats, p2_stats)
 
-            message = client.messages.create(
-                model="claude-haiku-4-5",
-                max_tokens=30,
-                messages=[{"role": "user", "content": prompt}]
-            )
+            # Stream the reply so an overlong answer, which would be rejected
+            # anyway, is abandoned as soon as it crosses the limits
+            raw = ""
+            wait_start = time.monotonic()
+            with self._api_sem:
+                waited = time.monotonic() - wait_start
+                if waited > 0.1:
+                    _logger.debug("Waited %.0f ms for a Claude request slot", waited * 1000)
+
+                with client.messages.stream(
+                    model="claude-haiku-4-5",
+                    max_tokens=30,
+                    messages=[{"role": "user", "content": prompt}]
+                ) as stream:
+                    for text in stream.text_stream:
+                        raw += text
+                        if _name_too_long(raw):
+                            return FALLBACK_NAMES[pair_idx % _FALLBACK_N]
 
-            raw = message.content[0].text.strip()
             # Sanitize: strip quotes, limit length, reject if too long or empty
-            raw = raw.strip('"\'')
-            words = raw.split()
-            if not words or len(words) > 6 or len(raw) > 50:
-                return FALLBACK_NAMES[pair_idx % len(FALLBACK_NAMES)]
+            raw = raw.strip().strip('"\'')
+            if not raw or _name_too_long(raw):
+                return FALLBACK_NAMES[pair_idx % _FALLBACK_N]
+            self._name_cache[key] = raw
             return raw
 
         except Exception:
-            return FALLBACK_NAMES[pair_idx % len(FALLBACK_NAMES)]
+            return FALLBACK_NAMES[pair_idx % _FALLBACK_N]
 
     def generate_names_for_all_pairs(self, pairs: list, on_name_ready=None,
                                      on_complete=None, use_threading=True):
-        """Generate names for all pairs. Fires callbacks as names arrive."""
+        """Generate names for all pairs. Fires callbacks as names arrive.
+
+        API requests run concurrently; callbacks are always fired from the
+        single coordinating thread, in completion order.
+        """
         def _run():
-            for i, (p1_id, p2_id) in enumerate(pairs):
-                if p2_id is None:
-                    name = FALLBACK_NAMES[i % len(FALLBACK_NAMES)]
-                else:
-                    name = self.generate_name_for_pair(p1_id, p2_id, i)
+            fallback_names, n_fallback = FALLBACK_NAMES, _FALLBACK_N
+
+            # Without a client every pair gets a fallback name; skip the
+            # stats queries and per-pair work entirely
+            if self._get_client() is None:
                 if on_name_ready:
-                    on_name_ready(i, name)
+                    for i in range(len(pairs)):
+                        on_name_ready(i, fallback_names[i % n_fallback])
+                if on_complete:
+                    on_complete()
+                return
+
+            # Players appear in several pairs; fetch each one's stats once
+            stats_cache = self._get_stats_for_pairs(pairs)
+
+            with ThreadPoolExecutor(max_workers=MAX_NAME_WORKERS) as pool:
+                futures = {}
+                for i, (p1_id, p2_id) in enumerate(pairs):
+                    if p2_id is None:
+                        if on_name_ready:
+                            on_name_ready(i, fallback_names[i % n_fallback])
+                    else:
+                        future = pool.submit(self.generate_name_for_pair,
+                                             p1_id, p2_id, i, stats_cache)
+                        futures[future] = i
+
+                for future in as_completed(futures):
+                    if on_name_ready:
+                        on_name_ready(futures[future], future.result())
             if on_complete:
                 on_complete()
 
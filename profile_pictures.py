@@ -5,13 +5,14 @@ Handles profile picture selection, avatars, and image management.
 
 import customtkinter as ctk
 import tkinter as tk
-from tkinter import Canvas, filedialog
-from PIL import Image, ImageTk, ImageDraw
+from tkinter import Canvas
+from PIL import Image
 import os
-import shutil
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional, Callable
-import hashlib
-from fonts import get_font
+import zlib
+from fonts import get_font, get_font_path
 
 
 # Default avatar colors for generating unique avatars
@@ -46,6 +47,152 @@ POOL_AVATARS = [
     "🐉",   # Dragon
 ]
 
+@lru_cache(maxsize=1024)
+def _color_for_name(name: str) -> tuple:
+    return AVATAR_COLORS[zlib.crc32(name.encode("utf-8")) % len(AVATAR_COLORS)]
+
+
+@lru_cache(maxsize=1024)
+def _initials_for_name(name: str) -> str:
+    parts = name.strip().split()
+    if len(parts) >= 2:
+        return (parts[0][0] + parts[-1][0]).upper()
+    elif len(parts) == 1 and len(parts[0]) >= 2:
+        return parts[0][:2].upper()
+    elif len(parts) == 1:
+        return parts[0][0].upper()
+    return "?"
+
+
+# Rendered avatar PhotoImages keyed by (name, size). Entries
+# are shared between widgets, so a roster refresh re-uses one image per
+# player instead of redrawing the ovals and initials on every canvas.
+_AVATAR_CACHE: dict = {}
+_AVATAR_CACHE_MAX = 256
+
+# Transparent avatar CTkImages keyed by (name, size) for ProfilePicture
+_AVATAR_IMAGES: dict = {}
+
+
+@lru_cache(maxsize=32)
+def _get_pil_font(size: int):
+    """Load the bundled font at a pixel size, or PIL's default font."""
+    from PIL import ImageFont
+    
+    font_path = get_font_path()
+    if font_path:
+        try:
+            return ImageFont.truetype(font_path, size)
+        except OSError:
+            pass
+    return ImageFont.load_default()
+
+
+@lru_cache(maxsize=8)
+def _get_emoji_font(size: int):
+    """Load the Segoe UI Emoji font at a pixel size, or None if missing."""
+    from PIL import ImageFont
+    
+    try:
+        return ImageFont.truetype("seguiemj.ttf", size)
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=256)
+def _render_avatar_image(name: str, size: int) -> Image.Image:
+    """Render a generated avatar (two circles and initials) on transparency."""
+    from PIL import ImageDraw
+    
+    colors = AvatarGenerator.get_color_for_name(name)
+    initials = AvatarGenerator.get_initials(name)
+    
+    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    
+    # Outer circle (darker)
+    padding = 2
+    draw.ellipse((padding, padding, size - padding, size - padding),
+                 fill=colors[1])
+    
+    # Inner circle (lighter)
+    inner_padding = size * 0.1
+    draw.ellipse((inner_padding, inner_padding,
+                  size - inner_padding, size - inner_padding),
+                 fill=colors[0])
+    
+    # Initials text; Tk font sizes are points, PIL wants pixels
+    font = _get_pil_font(int(size * 0.35) * 4 // 3)
+    draw.text((size / 2, size / 2), initials, font=font,
+              fill="white", anchor="mm")
+    return img
+
+
+# Circular custom-image PhotoImages keyed by (path, mtime, size), LRU-evicted
+_IMG_CACHE: OrderedDict = OrderedDict()
+_IMG_CACHE_MAX = 128
+
+# Browser tiles, rendered on first use and shared by every dialog
+_POOL_TILES: dict = {}
+_COLOR_TILES: dict = {}
+_TILE_SIZE = 60
+
+
+def _get_pool_tile(emoji: str):
+    """Get the CTkImage for an emoji tile, or None without an emoji font."""
+    from PIL import ImageDraw
+    
+    if emoji not in _POOL_TILES:
+        font = _get_emoji_font(40)
+        tile = None
+        if font is not None:
+            img = Image.new("RGBA", (_TILE_SIZE, _TILE_SIZE), (0, 0, 0, 0))
+            ImageDraw.Draw(img).text(
+                (_TILE_SIZE / 2, _TILE_SIZE / 2), emoji, font=font,
+                anchor="mm", embedded_color=True
+            )
+            tile = ctk.CTkImage(light_image=img, dark_image=img,
+                                size=(_TILE_SIZE, _TILE_SIZE))
+        _POOL_TILES[emoji] = tile
+    return _POOL_TILES[emoji]
+
+
+def _get_color_tile(index: int, initials: str):
+    """Get the CTkImage for a color avatar tile showing initials."""
+    from PIL import ImageDraw
+    
+    key = (index, initials)
+    tile = _COLOR_TILES.get(key)
+    if tile is None:
+        light, dark = AVATAR_COLORS[index]
+        img = Image.new("RGBA", (_TILE_SIZE, _TILE_SIZE), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(img)
+        draw.ellipse((2, 2, _TILE_SIZE - 2, _TILE_SIZE - 2),
+                     fill=light, outline=dark, width=2)
+        draw.text((_TILE_SIZE / 2, _TILE_SIZE / 2), initials,
+                  font=_get_pil_font(18 * 4 // 3), fill="white", anchor="mm")
+        tile = ctk.CTkImage(light_image=img, dark_image=img,
+                            size=(_TILE_SIZE, _TILE_SIZE))
+        _COLOR_TILES[key] = tile
+    return tile
+
+
+@lru_cache(maxsize=128)
+def _render_emoji_avatar(emoji: str, size: int, fill: str, outline: str):
+    """Render an emoji avatar as a CTkImage, or None without an emoji font."""
+    # Tk font sizes are points, PIL wants pixels
+    font = _get_emoji_font(int(size * 0.5) * 4 // 3)
+    if font is None:
+        return None
+    from PIL import ImageDraw
+    
+    img = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((2, 2, size - 2, size - 2), fill=fill, outline=outline, width=2)
+    draw.text((size / 2, size / 2), emoji, font=font,
+              anchor="mm", embedded_color=True)
+    return ctk.CTkImage(light_image=img, dark_image=img, size=(size, size))
+
 
 class AvatarGenerator:
     """Generates unique avatars based on player name."""
@@ -53,27 +200,21 @@ class AvatarGenerator:
     @staticmethod
     def get_color_for_name(name: str) -> tuple:
         """Get a consistent color pair for a name."""
-        hash_val = int(hashlib.md5(name.encode()).hexdigest(), 16)
-        return AVATAR_COLORS[hash_val % len(AVATAR_COLORS)]
+        return _color_for_name(name)
     
     @staticmethod
     def get_initials(name: str) -> str:
         """Get initials from a name (up to 2 characters)."""
-        parts = name.strip().split()
-        if len(parts) >= 2:
-            return (parts[0][0] + parts[-1][0]).upper()
-        elif len(parts) == 1 and len(parts[0]) >= 2:
-            return parts[0][:2].upper()
-        elif len(parts) == 1:
-            return parts[0][0].upper()
-        return "?"
+        return _initials_for_name(name)
+    
+    @staticmethod
+    def render_pil(name: str, size: int = 50) -> Image.Image:
+        """Render an avatar for a name as a transparent PIL image."""
+        return _render_avatar_image(name, size)
     
     @staticmethod
     def create_avatar_canvas(parent, name: str, size: int = 50) -> Canvas:
         """Create a canvas with an avatar based on name."""
-        colors = AvatarGenerator.get_color_for_name(name)
-        initials = AvatarGenerator.get_initials(name)
-        
         # Get parent background color or use default
         try:
             parent_bg = parent.cget("fg_color")
@@ -84,35 +225,21 @@ class AvatarGenerator:
         except (tk.TclError, AttributeError):
             parent_bg = "#252540"
         
+        # The avatar is transparent and the Canvas paints the background,
+        # so Tk color names (e.g. "gray17") never reach PIL
+        key = (name, size)
+        photo = _AVATAR_CACHE.get(key)
+        if photo is None:
+            from PIL import ImageTk
+            if len(_AVATAR_CACHE) >= _AVATAR_CACHE_MAX:
+                _AVATAR_CACHE.pop(next(iter(_AVATAR_CACHE)))
+            photo = ImageTk.PhotoImage(_render_avatar_image(name, size))
+            _AVATAR_CACHE[key] = photo
+        
         canvas = Canvas(parent, width=size, height=size, 
                        bg=parent_bg, highlightthickness=0)
-        
-        # Draw circular background with gradient effect
-        padding = 2
-        
-        # Outer circle (darker)
-        canvas.create_oval(
-            padding, padding,
-            size - padding, size - padding,
-            fill=colors[1], outline=""
-        )
-        
-        # Inner circle (lighter)
-        inner_padding = size * 0.1
-        canvas.create_oval(
-            inner_padding, inner_padding,
-            size - inner_padding, size - inner_padding,
-            fill=colors[0], outline=""
-        )
-        
-        # Initials text
-        font_size = int(size * 0.35)
-        canvas.create_text(
-            size // 2, size // 2,
-            text=initials,
-            font=("Arial", font_size, "bold"),
-            fill="white"
-        )
+        canvas.create_image(size // 2, size // 2, image=photo)
+        canvas.image = photo  # Keep reference to prevent garbage collection
         
         return canvas
 
@@ -134,6 +261,8 @@ class ProfilePicture(ctk.CTkFrame):
         self.clickable = clickable
         
         self._image = None  # Keep reference to prevent garbage collection
+        self._bg_color = None  # Resolved once by _get_bg_color
+        self._shown = None  # (image_path, mtime) currently displayed
         self._create_display()
         
         if clickable:
@@ -147,6 +276,7 @@ class ProfilePicture(ctk.CTkFrame):
         for widget in self.winfo_children():
             widget.destroy()
         
+        self._shown = self._display_state(self.image_path)
         if self.image_path and os.path.exists(self.image_path):
             self._display_image()
         elif self.image_path and self.image_path.startswith("emoji:"):
@@ -154,35 +284,73 @@ class ProfilePicture(ctk.CTkFrame):
         else:
             self._display_avatar()
     
+    @staticmethod
+    def _display_state(image_path: str) -> tuple:
+        """Get (path, mtime) so a replaced file counts as a change."""
+        try:
+            mtime = os.path.getmtime(image_path) if image_path else None
+        except (OSError, ValueError):
+            mtime = None
+        return (image_path, mtime)
+    
     def _get_bg_color(self):
         """Get an appropriate background color."""
+        if self._bg_color is not None:
+            return self._bg_color
         try:
             parent_bg = self.cget("fg_color")
             if isinstance(parent_bg, tuple):
                 parent_bg = parent_bg[1]
             if not parent_bg or parent_bg == "transparent":
-                return "#252540"
-            return parent_bg
+                parent_bg = "#252540"
         except (tk.TclError, AttributeError):
-            return "#252540"
+            parent_bg = "#252540"
+        self._bg_color = parent_bg
+        return parent_bg
     
     def _display_image(self):
         """Display a custom image."""
         try:
-            img = Image.open(self.image_path)
-            img = img.resize((self.size, self.size), Image.Resampling.LANCZOS)
-            
-            # Create circular mask
-            mask = Image.new('L', (self.size, self.size), 0)
-            draw = ImageDraw.Draw(mask)
-            draw.ellipse((0, 0, self.size, self.size), fill=255)
-            
-            # Apply mask
-            output = Image.new('RGBA', (self.size, self.size), (0, 0, 0, 0))
-            output.paste(img, (0, 0))
-            output.putalpha(mask)
+            key = (self.image_path, os.path.getmtime(self.image_path), self.size)
+            photo = _IMG_CACHE.get(key)
+            if photo is not None:
+                _IMG_CACHE.move_to_end(key)
+            else:
+                from PIL import ImageDraw, ImageTk
+                
+                img = Image.open(self.image_path)
+                # Let JPEGs decode at a reduced scale; no-op for other formats
+                img.draft('RGB', (self.size * 2, self.size * 2))
+                # Smaller kernels are indistinguishable at avatar sizes
+                if self.size <= 32:
+                    resample = Image.Resampling.BILINEAR
+                elif self.size <= 96:
+                    resample = Image.Resampling.BICUBIC
+                else:
+                    resample = Image.Resampling.LANCZOS
+                img = img.resize((self.size, self.size), resample)
+                
+                # Create circular mask, supersampled for smooth small edges
+                scale = 2 if self.size <= 64 else 1
+                mask_size = self.size * scale
+                mask = Image.new('L', (mask_size, mask_size), 0)
+                draw = ImageDraw.Draw(mask)
+                draw.ellipse((0, 0, mask_size, mask_size), fill=255)
+                if scale > 1:
+                    mask = mask.resize((self.size, self.size),
+                                       Image.Resampling.BICUBIC)
+                
+                # Apply mask
+                output = Image.new('RGBA', (self.size, self.size), (0, 0, 0, 0))
+                output.paste(img, (0, 0))
+                output.putalpha(mask)
+                
+                photo = ImageTk.PhotoImage(output)
+                _IMG_CACHE[key] = photo
+                if len(_IMG_CACHE) > _IMG_CACHE_MAX:
+                    _IMG_CACHE.popitem(last=False)
             
-            self._image = ImageTk.PhotoImage(output)
+            self._image = photo
             
             canvas = Canvas(self, width=self.size, height=self.size,
                           bg=self._get_bg_color(), highlightthickness=0)
@@ -198,12 +366,21 @@ class ProfilePicture(ctk.CTkFrame):
     
     def _display_emoji(self, emoji: str):
         """Display an emoji avatar."""
+        colors = AvatarGenerator.get_color_for_name(self.player_name or "default")
+        image = _render_emoji_avatar(emoji, self.size, colors[0], colors[1])
+        if image is not None:
+            label = ctk.CTkLabel(self, image=image, text="",
+                                 width=self.size, height=self.size)
+            label.pack()
+            if self.clickable:
+                label.bind("<Button-1>", self._handle_click)
+            return
+        
         canvas = Canvas(self, width=self.size, height=self.size,
                        bg=self._get_bg_color(), highlightthickness=0)
         canvas.pack()
         
         # Background circle
-        colors = AvatarGenerator.get_color_for_name(self.player_name or "default")
         canvas.create_oval(
             2, 2, self.size-2, self.size-2,
             fill=colors[0], outline=colors[1], width=2
@@ -222,13 +399,23 @@ class ProfilePicture(ctk.CTkFrame):
     
     def _display_avatar(self):
         """Display a generated avatar."""
-        canvas = AvatarGenerator.create_avatar_canvas(
-            self, self.player_name or "?", self.size
-        )
-        canvas.pack()
+        name = self.player_name or "?"
+        key = (name, self.size)
+        image = _AVATAR_IMAGES.get(key)
+        if image is None:
+            if len(_AVATAR_IMAGES) >= _AVATAR_CACHE_MAX:
+                _AVATAR_IMAGES.pop(next(iter(_AVATAR_IMAGES)))
+            img = AvatarGenerator.render_pil(name, self.size)
+            image = ctk.CTkImage(light_image=img, dark_image=img,
+                                 size=(self.size, self.size))
+            _AVATAR_IMAGES[key] = image
+        
+        label = ctk.CTkLabel(self, image=image, text="",
+                             width=self.size, height=self.size)
+        label.pack()
         
         if self.clickable:
-            canvas.bind("<Button-1>", self._handle_click)
+            label.bind("<Button-1>", self._handle_click)
     
     def _handle_click(self, event=None):
         """Handle click on the profile picture."""
@@ -246,6 +433,9 @@ class ProfilePicture(ctk.CTkFrame):
     
     def update_picture(self, image_path: str):
         """Update the displayed picture."""
+        if (self.winfo_children()
+                and self._shown == self._display_state(image_path)):
+            return
         self.image_path = image_path
         self._create_display()
 
@@ -380,25 +570,20 @@ class ProfilePictureBrowser(ctk.CTkToplevel):
             avatar_frame.grid(row=row, column=col, padx=8, pady=8)
             avatar_frame.pack_propagate(False)
             
-            # Emoji display
-            ctk.CTkLabel(
-                avatar_frame,
-                text=emoji,
-                font=get_font(40)
-            ).pack(expand=True)
+            # Emoji display (pre-rendered tile when an emoji font is available)
+            tile = _get_pool_tile(emoji)
+            if tile is not None:
+                ctk.CTkLabel(avatar_frame, image=tile, text="").pack(expand=True)
+            else:
+                ctk.CTkLabel(
+                    avatar_frame,
+                    text=emoji,
+                    font=get_font(40)
+                ).pack(expand=True)
             
             # Make clickable
-            avatar_frame.bind("<Button-1>", 
-                             lambda e, em=emoji: self._select_emoji(em))
-            for child in avatar_frame.winfo_children():
-                child.bind("<Button-1>", 
-                          lambda e, em=emoji: self._select_emoji(em))
-            
-            # Hover effect
-            avatar_frame.bind("<Enter>", 
-                             lambda e, f=avatar_frame: f.configure(fg_color="#454570"))
-            avatar_frame.bind("<Leave>", 
-                             lambda e, f=avatar_frame: f.configure(fg_color="#353550"))
+            avatar_frame._avatar_payload = f"emoji:{emoji}"
+            self._bind_tile(avatar_frame)
     
     def _create_color_avatars(self, parent):
         """Create the color-based avatars grid."""
@@ -410,7 +595,7 @@ class ProfilePictureBrowser(ctk.CTkToplevel):
         
         initials = AvatarGenerator.get_initials(self.player_name)
         
-        for i, (light, dark) in enumerate(AVATAR_COLORS):
+        for i in range(len(AVATAR_COLORS)):
             row = i // 4
             col = i % 4
             
@@ -419,26 +604,52 @@ class ProfilePictureBrowser(ctk.CTkToplevel):
             avatar_frame.grid(row=row, column=col, padx=8, pady=8)
             avatar_frame.pack_propagate(False)
             
-            # Create mini avatar canvas
-            canvas = Canvas(avatar_frame, width=60, height=60,
-                           bg="#353550", highlightthickness=0)
-            canvas.pack(expand=True)
-            
-            canvas.create_oval(2, 2, 58, 58, fill=light, outline=dark, width=2)
-            canvas.create_text(30, 30, text=initials,
-                              font=("Arial", 18, "bold"), fill="white")
+            # Mini avatar tile
+            tile_label = ctk.CTkLabel(avatar_frame, image=_get_color_tile(i, initials),
+                                      text="")
+            tile_label.pack(expand=True)
             
             # Make clickable
-            color_id = f"color:{i}"
-            avatar_frame.bind("<Button-1>",
-                             lambda e, c=color_id: self._select_color(c))
-            canvas.bind("<Button-1>",
-                       lambda e, c=color_id: self._select_color(c))
-            
-            avatar_frame.bind("<Enter>",
-                             lambda e, f=avatar_frame: f.configure(fg_color="#454570"))
-            avatar_frame.bind("<Leave>",
-                             lambda e, f=avatar_frame: f.configure(fg_color="#353550"))
+            avatar_frame._avatar_payload = f"color:{i}"
+            self._bind_tile(avatar_frame)
+    
+    def _bind_tile(self, avatar_frame):
+        """Bind the shared click and hover handlers to an avatar tile."""
+        avatar_frame.bind("<Button-1>", self._on_tile_click)
+        for child in avatar_frame.winfo_children():
+            child.bind("<Button-1>", self._on_tile_click)
+        avatar_frame.bind("<Enter>", self._on_tile_enter)
+        avatar_frame.bind("<Leave>", self._on_tile_leave)
+    
+    @staticmethod
+    def _tile_for(widget):
+        """Find the avatar tile frame that owns an event's widget."""
+        while widget is not None and not hasattr(widget, "_avatar_payload"):
+            widget = widget.master
+        return widget
+    
+    def _on_tile_click(self, event):
+        """Select the avatar of the clicked tile."""
+        tile = self._tile_for(event.widget)
+        if tile is None:
+            return
+        payload = tile._avatar_payload
+        if payload.startswith("emoji:"):
+            self._select_emoji(payload[6:])
+        else:
+            self._select_color(payload)
+    
+    def _on_tile_enter(self, event):
+        """Highlight a tile on hover."""
+        tile = self._tile_for(event.widget)
+        if tile is not None:
+            tile.configure(fg_color="#454570")
+    
+    def _on_tile_leave(self, event):
+        """Remove the hover highlight from a tile."""
+        tile = self._tile_for(event.widget)
+        if tile is not None:
+            tile.configure(fg_color="#353550")
     
     def _create_custom_image_tab(self, parent):
         """Create the custom image upload section."""
@@ -493,6 +704,8 @@ class ProfilePictureBrowser(ctk.CTkToplevel):
     
     def _browse_image(self):
         """Browse for a custom image."""
+        from tkinter import filedialog
+        
         filepath = filedialog.askopenfilename(
             title="Select Profile Picture",
             filetypes=[
@@ -506,13 +719,25 @@ class ProfilePictureBrowser(ctk.CTkToplevel):
             pictures_dir = os.path.join(os.path.dirname(__file__), "profile_pictures")
             os.makedirs(pictures_dir, exist_ok=True)
             
-            # Create unique filename
-            ext = os.path.splitext(filepath)[1]
-            new_filename = f"{hashlib.md5(filepath.encode()).hexdigest()[:12]}{ext}"
+            # Create unique filename; size and mtime go into the hash so
+            # different uploads are unlikely to collide on a 32-bit CRC
+            try:
+                st = os.stat(filepath)
+                source_key = f"{filepath}|{st.st_size}|{st.st_mtime_ns}"
+            except OSError:
+                source_key = filepath
+            new_filename = f"{zlib.crc32(source_key.encode()):08x}.png"
             new_path = os.path.join(pictures_dir, new_filename)
             
             try:
-                shutil.copy2(filepath, new_path)
+                # Store a small PNG rather than the full-size original so
+                # every later render decodes at most 256x256 pixels
+                img = Image.open(filepath)
+                img.draft('RGB', (512, 512))
+                img.thumbnail((256, 256), Image.Resampling.LANCZOS)
+                if img.mode not in ("RGB", "RGBA"):
+                    img = img.convert("RGBA")
+                img.save(new_path, "PNG", optimize=True)
                 self.selected_picture = new_path
                 self.image_path_label.configure(
                     text=f"Selected: {os.path.basename(filepath)}",
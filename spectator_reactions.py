@@ -3,15 +3,34 @@ EcoPOOL League - Spectator Reactions
 Allows web viewers to send reactions that appear on the main display.
 """
 
+import json
+import logging
 import threading
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from dataclasses import dataclass
 from typing import List, Dict, Callable, Optional
-from collections import deque
+from collections import OrderedDict
+from functools import cache
 
+_logger = logging.getLogger(__name__)
 
-@dataclass
+# Optional: fastrlock's C-level lock is much cheaper to take when uncontended
+try:
+    from fastrlock.rlock import FastRLock
+    FASTRLOCK_AVAILABLE = True
+except ImportError:
+    FASTRLOCK_AVAILABLE = False
+
+# Optional: orjson serializes datetimes natively and is much faster than json
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+@dataclass(slots=True)
 class Reaction:
     """Represents a spectator reaction."""
     id: int
@@ -19,44 +38,60 @@ class Reaction:
     text: str
     sender: str
     timestamp: datetime
-    expires_at: datetime
+    expires_at: float  # time.monotonic() deadline
 
 
-# Available reaction types
+# Available reaction types: key -> (emoji, text)
 REACTIONS = {
-    'ecocar': {'emoji': '🚗', 'text': 'EcoCAR!'},
-    'nice_shot': {'emoji': '🎯', 'text': 'Nice shot!'},
-    'great_game': {'emoji': '🔥', 'text': 'Great game!'},
-    'gg': {'emoji': '👏', 'text': 'GG!'},
-    'wow': {'emoji': '😮', 'text': 'WOW!'},
-    'clutch': {'emoji': '💪', 'text': 'CLUTCH!'},
-    'pool': {'emoji': '🎱', 'text': ''},
-    'trophy': {'emoji': '🏆', 'text': ''},
-    'fire': {'emoji': '🔥', 'text': ''},
-    'star': {'emoji': '⭐', 'text': ''},
-    'heart': {'emoji': '❤️', 'text': ''},
-    'laughing': {'emoji': '😂', 'text': ''},
-    'thinking': {'emoji': '🤔', 'text': ''},
+    'ecocar': ('🚗', 'EcoCAR!'),
+    'nice_shot': ('🎯', 'Nice shot!'),
+    'great_game': ('🔥', 'Great game!'),
+    'gg': ('👏', 'GG!'),
+    'wow': ('😮', 'WOW!'),
+    'clutch': ('💪', 'CLUTCH!'),
+    'pool': ('🎱', ''),
+    'trophy': ('🏆', ''),
+    'fire': ('🔥', ''),
+    'star': ('⭐', ''),
+    'heart': ('❤️', ''),
+    'laughing': ('😂', ''),
+    'thinking': ('🤔', ''),
 }
 
+# Longest sender name shown with a reaction
+MAX_SENDER_LENGTH = 20
+
 
 class ReactionManager:
     """Manages spectator reactions."""
 
-    def __init__(self, display_duration: int = 5, max_reactions: int = 20):
+    def __init__(self, display_duration: int = 5, max_reactions: int = 20,
+                 batch_window: float = 0.1):
         """Initialize the reaction manager.
 
         Args:
             display_duration: How long reactions are displayed (seconds)
             max_reactions: Maximum number of reactions to keep
+            batch_window: Seconds to collect reactions before notifying
+                callbacks, so a burst of taps becomes one update
         """
         self.display_duration = display_duration
         self.max_reactions = max_reactions
-        self._reactions: deque = deque(maxlen=max_reactions)
+        # Ring buffer of the latest reactions. Only add_reaction writes it
+        # (under _lock); readers snapshot _write and read slots lock-free,
+        # relying on list item access being atomic under the GIL.
+        self._buf: List[Optional[Reaction]] = [None] * max_reactions
+        self._write = 0
         self._reaction_id = 0
-        self._lock = threading.Lock()
+        self._lock = FastRLock() if FASTRLOCK_AVAILABLE else threading.Lock()
         self._callbacks: List[Callable] = []
-        self._rate_limits: Dict[str, datetime] = {}
+        # Registered callback -> the error-logging wrapper stored in _callbacks
+        self._wrappers: Dict[Callable, Callable] = {}
+        self._batch_window = batch_window
+        self._pending: List[Reaction] = []
+        self._flush_timer: Optional[threading.Timer] = None
+        # Oldest entry first, so expired IPs are evicted from the front
+        self._rate_limits: "OrderedDict[str, float]" = OrderedDict()
         self._rate_limit_seconds = 2  # Minimum seconds between reactions per IP
 
     def add_reaction(self, reaction_type: str, sender: str = "Anonymous",
@@ -71,52 +106,67 @@ class ReactionManager:
         Returns:
             The created Reaction, or None if rate limited
         """
-        if reaction_type not in REACTIONS:
+        reaction_data = REACTIONS.get(reaction_type)
+        if reaction_data is None:
             return None
+        emoji, text = reaction_data
+        if len(sender) > MAX_SENDER_LENGTH:
+            sender = sender[:MAX_SENDER_LENGTH]
 
         # Rate limiting
         if client_ip:
             with self._lock:
                 last_reaction = self._rate_limits.get(client_ip)
-                now = datetime.now()
+                now = time.monotonic()
 
-                if last_reaction and (now - last_reaction).total_seconds() < self._rate_limit_seconds:
+                if last_reaction is not None and now - last_reaction < self._rate_limit_seconds:
                     return None  # Rate limited
 
+                self._rate_limits.pop(client_ip, None)
                 self._rate_limits[client_ip] = now
 
                 # Clean old rate limit entries
-                cutoff = now - timedelta(minutes=5)
-                self._rate_limits = {k: v for k, v in self._rate_limits.items() if v > cutoff}
+                cutoff = now - 300
+                while self._rate_limits:
+                    oldest = next(iter(self._rate_limits.values()))
+                    if oldest > cutoff:
+                        break
+                    self._rate_limits.popitem(last=False)
 
-        reaction_data = REACTIONS[reaction_type]
+        timestamp = datetime.now()
+        expires_at = time.monotonic() + self.display_duration
 
         with self._lock:
             self._reaction_id += 1
-            now = datetime.now()
-
-            reaction = Reaction(
-                id=self._reaction_id,
-                emoji=reaction_data['emoji'],
-                text=reaction_data['text'],
-                sender=sender[:20],  # Limit sender name length
-                timestamp=now,
-                expires_at=now + timedelta(seconds=self.display_duration)
-            )
+            reaction = Reaction(self._reaction_id, emoji, text, sender,
+                                timestamp, expires_at)
 
-            self._reactions.append(reaction)
+            self._buf[self._write % self.max_reactions] = reaction
+            self._write += 1
 
-        # Notify callbacks
-        self._notify_reaction(reaction)
+            # Queue for the next batched callback notification
+            self._pending.append(reaction)
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self._batch_window,
+                                                    self._flush_pending)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
 
         return reaction
 
     def get_active_reactions(self) -> List[Reaction]:
         """Get all currently active (non-expired) reactions."""
-        now = datetime.now()
-
-        with self._lock:
-            return [r for r in self._reactions if r.expires_at > now]
+        now = time.monotonic()
+        buf = self._buf
+        size = self.max_reactions
+        write = self._write
+
+        active = []
+        for i in range(max(0, write - size), write):
+            r = buf[i % size]
+            if r is not None and r.expires_at > now:
+                active.append(r)
+        return active
 
     def get_reaction_json(self) -> List[Dict]:
         """Get active reactions as JSON-serializable list."""
@@ -131,42 +181,94 @@ class ReactionManager:
             for r in self.get_active_reactions()
         ]
 
-    def register_callback(self, callback: Callable):
+    def get_reaction_bytes(self) -> bytes:
+        """Get active reactions as an encoded JSON array.
+
+        Same content as get_reaction_json, serialized in one pass.
+        """
+        if not ORJSON_AVAILABLE:
+            return json.dumps(self.get_reaction_json()).encode()
+
+        return orjson.dumps([
+            {
+                'id': r.id,
+                'emoji': r.emoji,
+                'text': r.text,
+                'sender': r.sender,
+                'timestamp': r.timestamp
+            }
+            for r in self.get_active_reactions()
+        ])
+
+    def register_callback(self, callback: Callable[[List[Reaction]], None]):
         """Register a callback for new reactions.
 
+        Callback receives (reactions: List[Reaction]) with every reaction
+        added during one batch window.
+        """
+        safe = self._safe_callback(callback, callback)
+        with self._lock:
+            self._wrappers[callback] = safe
+            self._callbacks.append(safe)
+
+    def register_single_callback(self, callback: Callable[[Reaction], None]):
+        """Register a callback that is called once per reaction.
+
         Callback receives (reaction: Reaction) as argument.
         """
-        self._callbacks.append(callback)
+        def adapter(reactions: List[Reaction]):
+            for reaction in reactions:
+                callback(reaction)
+
+        safe = self._safe_callback(callback, adapter)
+        with self._lock:
+            self._wrappers[callback] = safe
+            self._callbacks.append(safe)
 
     def unregister_callback(self, callback: Callable):
         """Unregister a reaction callback."""
-        if callback in self._callbacks:
-            self._callbacks.remove(callback)
-
-    def _notify_reaction(self, reaction: Reaction):
-        """Notify all callbacks of a new reaction."""
-        for callback in self._callbacks:
+        with self._lock:
+            callback = self._wrappers.pop(callback, callback)
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    @staticmethod
+    def _safe_callback(callback: Callable, target: Callable) -> Callable:
+        """Wrap target so an exception is logged instead of propagating."""
+        def safe(reactions: List[Reaction]):
             try:
-                callback(reaction)
+                target(reactions)
             except Exception:
-                pass
+                _logger.exception("Reaction callback %r failed", callback)
 
-    def clear(self):
-        """Clear all reactions."""
+        return safe
+
+    def _flush_pending(self):
+        """Deliver the reactions collected during the batch window."""
         with self._lock:
-            self._reactions.clear()
+            reactions = self._pending
+            self._pending = []
+            self._flush_timer = None
+            callbacks = tuple(self._callbacks)
 
+        if reactions:
+            self._notify_reactions(reactions, callbacks)
 
-# Global reaction manager
-_reaction_manager: Optional[ReactionManager] = None
+    def _notify_reactions(self, reactions: List[Reaction], callbacks: tuple):
+        """Notify a snapshot of callbacks of a batch of new reactions."""
+        for callback in callbacks:
+            callback(reactions)
+
+    def clear(self):
+        """Clear all reactions."""
+        with self._lock:
+            self._buf = [None] * self.max_reactions
 
 
+@cache
 def get_reaction_manager() -> ReactionManager:
-    """Get the global reaction manager."""
-    global _reaction_manager
-    if _reaction_manager is None:
-        _reaction_manager = ReactionManager()
-    return _reaction_manager
+    """Get the global reaction manager (created on first call)."""
+    return ReactionManager()
 
 
 # Flask routes for reactions (to be added to web_server.py)
@@ -289,11 +391,11 @@ function showLocalReaction(emoji) {
     setTimeout(() => reaction.remove(), 3000);
 }
 
-// Listen for reactions from SSE
+// Listen for batched reactions from SSE
 if (typeof eventSource !== 'undefined') {
-    eventSource.addEventListener('reaction', function(e) {
+    eventSource.addEventListener('reactions-multi', function(e) {
         const data = JSON.parse(e.data);
-        showLocalReaction(data.emoji);
+        (data.reactions || []).forEach(r => showLocalReaction(r.emoji));
     });
 }
 </script>
@@ -26,6 +26,10 @@ print(f"\nResult: ok={ok}  msg={msg!r}\n")
 # ---------- inspect results ----------
 conn = sqlite3.connect(TEST_DB)
 conn.row_factory = sqlite3.Row
+# Read-only inspection: keep pages in a large cache / memory map
+conn.executescript(
+    "PRAGMA cache_size=-65536; PRAGMA mmap_size=268435456; PRAGMA temp_store=MEMORY;"
+)
 cur  = conn.cursor()
 
 # Players created
@@ -46,35 +50,39 @@ for n in nights:
 for night in nights:
     nid = night['id']
 
+    # Pair names and both players' names in one query
     cur.execute("""
-        SELECT lnp.id, lnp.pair_name as name, lnp.player1_id, lnp.player2_id
+        SELECT lnp.id, lnp.pair_name as name, lnp.player2_id,
+               p1.name as p1_name, p2.name as p2_name
         FROM league_night_pairs lnp
+        LEFT JOIN players p1 ON p1.id = lnp.player1_id
+        LEFT JOIN players p2 ON p2.id = lnp.player2_id
         WHERE lnp.league_night_id = ?
         ORDER BY lnp.id
     """, (nid,))
     night_pairs = cur.fetchall()
     print(f"\n--- Night {nid} '{night['date']}' — {len(night_pairs)} pairs ---")
     for p in night_pairs:
-        cur.execute("SELECT name FROM players WHERE id=?", (p['player1_id'],))
-        p1 = cur.fetchone()
         p2_name = "solo"
         if p['player2_id']:
-            cur.execute("SELECT name FROM players WHERE id=?", (p['player2_id'],))
-            r = cur.fetchone()
-            p2_name = r['name'] if r else "?"
-        print(f"  pair {p['id']:3d}: {p['name']:<40s}  ({p1['name'] if p1 else '?'} / {p2_name})")
+            p2_name = p['p2_name'] or "?"
+        print(f"  pair {p['id']:3d}: {p['name']:<40s}  ({p['p1_name'] or '?'} / {p2_name})")
 
+    # Matches with their first game's result in one query
     cur.execute("""
-        SELECT m.id, m.round_number, m.pair1_id, m.pair2_id
+        SELECT m.id, m.round_number, m.pair1_id, m.pair2_id,
+               g.id as game_id, g.team1_score, g.team2_score, g.winner_team
         FROM matches m
+        LEFT JOIN games g ON g.id = (
+            SELECT MIN(id) FROM games WHERE match_id = m.id
+        )
         WHERE m.league_night_id = ?
         ORDER BY m.round_number, m.id
     """, (nid,))
     matches = cur.fetchall()
     print(f"  → {len(matches)} matches")
     for m in matches:
-        cur.execute("SELECT team1_score, team2_score, winner_team FROM games WHERE match_id=?", (m['id'],))
-        g = cur.fetchone()
+        g = m if m['game_id'] is not None else None
         score = f"{g['team1_score']}-{g['team2_score']} (W={g['winner_team']})" if g else "no game"
         print(f"    set {m['round_number']}  pair{m['pair1_id']} vs pair{m['pair2_id']}  {score}")
 
@@ -6,15 +6,33 @@ Note: Venmo does not have a public API for sending payment requests.
 This module uses deep links which open the Venmo app with pre-filled info.
 """
 
+import re
 import webbrowser
 import urllib.parse
 import platform
 import sys
 from dataclasses import dataclass
-from typing import Optional, List, Dict
+from functools import lru_cache
+from typing import Optional, List, Dict, Iterator, Tuple
 from datetime import datetime
 
 
+# 5-30 chars of letters, digits, '_' or '-', not starting with a digit
+_VENMO_USERNAME_RE = re.compile(r'[A-Za-z_-][A-Za-z0-9_-]{4,29}')
+
+
+@lru_cache(maxsize=256)
+def _quote_note(note: str) -> str:
+    """URL-encode a payment note (bulk flows reuse the same few notes)."""
+    return urllib.parse.quote(note)
+
+
+@lru_cache(maxsize=256)
+def _strip_at(venmo_username: str) -> str:
+    """Return a Venmo username without its leading @."""
+    return venmo_username.lstrip('@')
+
+
 @dataclass
 class PaymentRequest:
     """Represents a payment request."""
@@ -32,6 +50,19 @@ class PaymentRequest:
 class VenmoIntegration:
     """Handles Venmo integration for buy-ins and payments."""
 
+    # Kept as constants so every call passes the identical string and hits
+    # sqlite3's per-connection statement cache instead of re-preparing
+    _REQUEST_INSERT_SQL = '''
+        INSERT INTO payment_requests (league_night_id, player_id, amount, note, status)
+        VALUES (?, ?, ?, ?, 'pending')
+    '''
+    _AUDIT_INSERT_SQL = '''
+        INSERT INTO payment_audit_log
+        (payment_request_id, league_night_id, player_id, action, old_status,
+         new_status, amount, note, performed_by, performed_at, details)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
     def __init__(self, db_manager):
         self.db = db_manager
         self._init_tables()
@@ -78,6 +109,35 @@ class VenmoIntegration:
             )
         ''')
 
+        # Indexes for the league night / player / status filters and the
+        # audit log's performed_at ordering
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_pr_night'"
+        )
+        indexes_exist = cursor.fetchone() is not None
+
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_pr_night
+            ON payment_requests(league_night_id, status)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_pr_player
+            ON payment_requests(player_id)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_audit_night
+            ON payment_audit_log(league_night_id, performed_at DESC)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_audit_player
+            ON payment_audit_log(player_id, performed_at DESC)
+        ''')
+
+        # Gather planner statistics once, when the indexes are first created
+        if not indexes_exist:
+            cursor.execute('ANALYZE payment_requests')
+            cursor.execute('ANALYZE payment_audit_log')
+
         conn.commit()
 
     # ============ Deep Link Generation ============
@@ -98,10 +158,10 @@ class VenmoIntegration:
             Venmo deep link URL
         """
         # Clean up username (remove @ if present)
-        username = venmo_username.lstrip('@')
+        username = _strip_at(venmo_username)
 
         # URL encode the note
-        encoded_note = urllib.parse.quote(note)
+        encoded_note = _quote_note(note)
 
         # Venmo deep link format
         # venmo://paycharge?txn=pay&recipients={username}&amount={amount}&note={note}
@@ -124,8 +184,8 @@ class VenmoIntegration:
         Returns:
             Venmo deep link URL
         """
-        username = venmo_username.lstrip('@')
-        encoded_note = urllib.parse.quote(note)
+        username = _strip_at(venmo_username)
+        encoded_note = _quote_note(note)
 
         # Request link uses txn=charge
         deep_link = f"venmo://paycharge?txn=charge&recipients={username}&amount={amount}&note={encoded_note}"
@@ -144,7 +204,7 @@ class VenmoIntegration:
         Returns:
             Venmo web URL
         """
-        username = venmo_username.lstrip('@')
+        username = _strip_at(venmo_username)
         return f"https://venmo.com/u/{username}"
 
     @staticmethod
@@ -156,8 +216,8 @@ class VenmoIntegration:
         Returns:
             URL to encode in QR code
         """
-        username = venmo_username.lstrip('@')
-        encoded_note = urllib.parse.quote(note)
+        username = _strip_at(venmo_username)
+        encoded_note = _quote_note(note)
         return f"https://venmo.com/{username}?txn=pay&amount={amount}&note={encoded_note}"
 
     # ============ Payment Request Management ============
@@ -167,25 +227,37 @@ class VenmoIntegration:
                                performed_by: str = 'system') -> int:
         """Create a new payment request record.
 
+        The request and its audit entry are committed together.
+
         Returns:
             Request ID
         """
         conn = self.db.get_connection()
-        cursor = conn.cursor()
 
         if note is None:
             note = self.default_note
 
-        cursor.execute('''
-            INSERT INTO payment_requests (league_night_id, player_id, amount, note, status)
-            VALUES (?, ?, ?, ?, 'pending')
-        ''', (league_night_id, player_id, amount, note))
-
+        cursor = conn.cursor()
+        request_id, audit_row = self._insert_request(cursor, league_night_id, player_id,
+                                                     amount, note, performed_by)
+        cursor.execute(self._AUDIT_INSERT_SQL, audit_row)
         conn.commit()
-        request_id = cursor.lastrowid
 
-        # Log to audit trail
-        self._log_audit(
+        return request_id
+
+    def _insert_request(self, cursor, league_night_id: int, player_id: int,
+                        amount: float, note: str, performed_by: str) -> Tuple[int, tuple]:
+        """Insert a pending payment request without committing.
+
+        Shared by the single and bulk create paths. Returns the request ID
+        and its 'created' audit row, which the caller writes with
+        _AUDIT_INSERT_SQL so bulk creates can batch them in one executemany.
+        """
+        cursor.execute(self._REQUEST_INSERT_SQL,
+                       (league_night_id, player_id, amount, note))
+
+        request_id = cursor.lastrowid
+        audit_row = self._audit_row(
             payment_request_id=request_id,
             league_night_id=league_night_id,
             player_id=player_id,
@@ -196,7 +268,7 @@ class VenmoIntegration:
             performed_by=performed_by
         )
 
-        return request_id
+        return request_id, audit_row
 
     def send_payment_request(self, request_id: int) -> bool:
         """Mark a payment request as sent and open Venmo.
@@ -222,62 +294,47 @@ class VenmoIntegration:
         if not row or not row['venmo']:
             return False
 
-        username = row['venmo'].lstrip('@')
-        amount = row['amount']
         note = row['note'] or f"EcoPOOL Buy-In - {row['name']}"
+        if not self._open_venmo(row['venmo'].lstrip('@'), row['amount'], note):
+            return False
+
+        # Update status
+        cursor.execute('''
+            UPDATE payment_requests
+            SET status = 'requested', requested_at = ?
+            WHERE id = ?
+        ''', (datetime.now().isoformat(), request_id))
 
+        conn.commit()
+        return True
+
+    def _open_venmo(self, username: str, amount: float, note: str) -> bool:
+        """Open Venmo for a request. Returns True if a link was opened."""
         # On desktop platforms, deep links often don't work
         # Use web link as fallback or primary method
         is_desktop = platform.system() in ('Windows', 'Darwin', 'Linux')
-        
+
         if is_desktop:
             # On desktop, open web version with payment link
             # Venmo web doesn't support deep links, so we'll open their profile
             # and show a message with instructions
-            web_link = self.generate_web_link(username)
             try:
-                webbrowser.open(web_link)
-                
-                # Update status
-                cursor.execute('''
-                    UPDATE payment_requests
-                    SET status = 'requested', requested_at = ?
-                    WHERE id = ?
-                ''', (datetime.now().isoformat(), request_id))
-                
-                conn.commit()
+                webbrowser.open(self.generate_web_link(username))
                 return True
             except Exception:
                 return False
-        else:
-            # On mobile, try deep link first
-            deep_link = self.generate_request_link(username, amount, note)
+
+        # On mobile, try deep link first
+        try:
+            webbrowser.open(self.generate_request_link(username, amount, note))
+            return True
+        except Exception:
+            # Fallback to web if deep link fails
             try:
-                webbrowser.open(deep_link)
-                
-                # Update status
-                cursor.execute('''
-                    UPDATE payment_requests
-                    SET status = 'requested', requested_at = ?
-                    WHERE id = ?
-                ''', (datetime.now().isoformat(), request_id))
-                
-                conn.commit()
+                webbrowser.open(self.generate_web_link(username))
                 return True
             except Exception:
-                # Fallback to web if deep link fails
-                web_link = self.generate_web_link(username)
-                try:
-                    webbrowser.open(web_link)
-                    cursor.execute('''
-                        UPDATE payment_requests
-                        SET status = 'requested', requested_at = ?
-                        WHERE id = ?
-                    ''', (datetime.now().isoformat(), request_id))
-                    conn.commit()
-                    return True
-                except Exception:
-                    return False
+                return False
 
     def mark_as_paid(self, request_id: int, txn_id: str = None, performed_by: str = 'system'):
         """Mark a payment request as paid."""
@@ -372,45 +429,125 @@ class VenmoIntegration:
                             amount: float, note: str = None) -> List[int]:
         """Create payment requests for multiple players.
 
+        All requests and their audit entries are written in one transaction,
+        so either every request is created or none are.
+
         Returns:
             List of created request IDs
         """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+
+        if note is None:
+            note = self.default_note
+
         request_ids = []
-        for player_id in player_ids:
-            req_id = self.create_payment_request(league_night_id, player_id, amount, note)
-            request_ids.append(req_id)
+        audit_rows = []
+        try:
+            for player_id in player_ids:
+                request_id, audit_row = self._insert_request(cursor, league_night_id, player_id,
+                                                             amount, note, 'system')
+                request_ids.append(request_id)
+                audit_rows.append(audit_row)
+
+            # All audit entries in one executemany on a single prepared statement
+            cursor.executemany(self._AUDIT_INSERT_SQL, audit_rows)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         return request_ids
 
-    def open_bulk_requests(self, request_ids: List[int], delay_ms: int = 500):
+    def open_bulk_requests(self, request_ids: List[int], delay_ms: int = 500) -> List[int]:
         """Open Venmo for multiple requests with delay between each.
 
+        Request details are fetched in one query before any browser is
+        opened, and the requests that opened are marked as requested in one
+        transaction afterwards, so the delays never hold the database.
+
         Note: This opens multiple Venmo windows/tabs. Use sparingly.
+
+        Returns:
+            IDs of the requests whose Venmo link was opened
         """
         import time
 
-        for i, req_id in enumerate(request_ids):
-            if i > 0:
-                time.sleep(delay_ms / 1000)
-            self.send_payment_request(req_id)
+        if not request_ids:
+            return []
 
-    def generate_payment_summary(self, league_night_id: int) -> Dict:
-        """Generate payment summary for a league night."""
-        requests = self.get_all_requests(league_night_id)
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
 
-        total_expected = sum(r['amount'] for r in requests)
-        total_paid = sum(r['amount'] for r in requests if r['status'] == 'paid')
-        total_pending = sum(r['amount'] for r in requests if r['status'] in ('pending', 'requested'))
+        placeholders = ','.join('?' * len(request_ids))
+        cursor.execute(f'''
+            SELECT pr.id, pr.amount, pr.note, p.venmo, p.name
+            FROM payment_requests pr
+            JOIN players p ON pr.player_id = p.id
+            WHERE pr.id IN ({placeholders})
+        ''', list(request_ids))
+        details = {row['id']: row for row in cursor.fetchall()}
+
+        opened = []
+        for req_id in request_ids:
+            row = details.get(req_id)
+            if not row or not row['venmo']:
+                continue
+            if opened:
+                time.sleep(delay_ms / 1000)
+            note = row['note'] or f"EcoPOOL Buy-In - {row['name']}"
+            if self._open_venmo(row['venmo'].lstrip('@'), row['amount'], note):
+                opened.append(req_id)
+
+        if opened:
+            requested_at = datetime.now().isoformat()
+            cursor.executemany('''
+                UPDATE payment_requests
+                SET status = 'requested', requested_at = ?
+                WHERE id = ?
+            ''', ((requested_at, req_id) for req_id in opened))
+            conn.commit()
+
+        return opened
+
+    def generate_payment_summary(self, league_night_id: int,
+                                 include_requests: bool = False) -> Dict:
+        """Generate payment summary for a league night.
+
+        Totals are computed by SQLite in one aggregate query. The full
+        request list is only fetched (under 'requests') when include_requests
+        is True.
+        """
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
 
-        return {
-            'total_requests': len(requests),
-            'paid_count': len([r for r in requests if r['status'] == 'paid']),
-            'pending_count': len([r for r in requests if r['status'] in ('pending', 'requested')]),
+        # Joined to players so the counts match get_all_requests
+        cursor.execute('''
+            SELECT
+                COUNT(*),
+                COALESCE(SUM(pr.amount), 0),
+                COALESCE(SUM(CASE WHEN pr.status = 'paid' THEN pr.amount ELSE 0 END), 0),
+                COALESCE(SUM(CASE WHEN pr.status IN ('pending', 'requested') THEN pr.amount ELSE 0 END), 0),
+                COALESCE(SUM(CASE WHEN pr.status = 'paid' THEN 1 ELSE 0 END), 0),
+                COALESCE(SUM(CASE WHEN pr.status IN ('pending', 'requested') THEN 1 ELSE 0 END), 0)
+            FROM payment_requests pr
+            JOIN players p ON pr.player_id = p.id
+            WHERE pr.league_night_id = ?
+        ''', (league_night_id,))
+        (total_requests, total_expected, total_paid, total_pending,
+         paid_count, pending_count) = cursor.fetchone()
+
+        summary = {
+            'total_requests': total_requests,
+            'paid_count': paid_count,
+            'pending_count': pending_count,
             'total_expected': total_expected,
             'total_paid': total_paid,
             'total_pending': total_pending,
             'collection_rate': (total_paid / total_expected * 100) if total_expected > 0 else 0,
-            'requests': requests
         }
+        if include_requests:
+            summary['requests'] = self.get_all_requests(league_night_id)
+        return summary
 
     # ============ QR Code Generation ============
 
@@ -468,17 +605,7 @@ class VenmoIntegration:
         """
         if not username:
             return False
-
-        username = username.lstrip('@')
-
-        if len(username) < 5 or len(username) > 30:
-            return False
-
-        if username[0].isdigit():
-            return False
-
-        allowed_chars = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-')
-        return all(c in allowed_chars for c in username)
+        return _VENMO_USERNAME_RE.fullmatch(username.lstrip('@')) is not None
 
     @staticmethod
     def format_venmo_username(username: str) -> str:
@@ -506,16 +633,22 @@ class VenmoIntegration:
         conn = self.db.get_connection()
         cursor = conn.cursor()
 
-        cursor.execute('''
-            INSERT INTO payment_audit_log
-            (payment_request_id, league_night_id, player_id, action, old_status,
-             new_status, amount, note, performed_by, performed_at, details)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (payment_request_id, league_night_id, player_id, action, old_status,
-              new_status, amount, note, performed_by, datetime.now().isoformat(), details))
+        cursor.execute(self._AUDIT_INSERT_SQL, self._audit_row(
+            payment_request_id, league_night_id, player_id, action, old_status,
+            new_status, amount, note, performed_by, details))
 
         conn.commit()
 
+    @staticmethod
+    def _audit_row(payment_request_id: Optional[int], league_night_id: int,
+                   player_id: int, action: str, old_status: str = None,
+                   new_status: str = None, amount: float = None,
+                   note: str = None, performed_by: str = 'system',
+                   details: str = None) -> tuple:
+        """Build the parameter tuple for _AUDIT_INSERT_SQL, stamped with the current time."""
+        return (payment_request_id, league_night_id, player_id, action, old_status,
+                new_status, amount, note, performed_by, datetime.now().isoformat(), details)
+
     def get_audit_log(self, league_night_id: int = None, player_id: int = None,
                       limit: int = 100) -> List[Dict]:
         """Get audit log entries with optional filters."""
@@ -594,8 +727,13 @@ class VenmoIntegration:
         total_collected = totals['total_collected']
         collection_rate = (total_collected / total_expected * 100) if total_expected > 0 else 0
 
+        # The breakdowns below are streamed as plain tuples so each row
+        # becomes exactly one output dict (no sqlite3.Row or dict(row) per row)
+        rows = conn.cursor()
+        rows.row_factory = None
+
         # Per-night breakdown
-        cursor.execute(f'''
+        rows.execute(f'''
             SELECT
                 b.league_night_id,
                 ln.date,
@@ -610,20 +748,10 @@ class VenmoIntegration:
             ORDER BY ln.date
         ''', night_ids)
 
-        by_night = []
-        for row in cursor.fetchall():
-            by_night.append({
-                'league_night_id': row['league_night_id'],
-                'date': row['date'],
-                'player_count': row['player_count'],
-                'expected': row['expected'],
-                'collected': row['collected'],
-                'paid_count': row['paid_count'],
-                'collection_rate': (row['collected'] / row['expected'] * 100) if row['expected'] > 0 else 0
-            })
+        by_night = list(self._iter_by_night(rows))
 
         # Per-player breakdown
-        cursor.execute(f'''
+        rows.execute(f'''
             SELECT
                 b.player_id,
                 p.name as player_name,
@@ -638,17 +766,7 @@ class VenmoIntegration:
             ORDER BY outstanding DESC, p.name
         ''', night_ids)
 
-        by_player = []
-        for row in cursor.fetchall():
-            by_player.append({
-                'player_id': row['player_id'],
-                'player_name': row['player_name'],
-                'nights_attended': row['nights_attended'],
-                'total_owed': row['total_owed'],
-                'total_paid': row['total_paid'],
-                'outstanding': row['outstanding'],
-                'payment_rate': (row['total_paid'] / row['total_owed'] * 100) if row['total_owed'] > 0 else 0
-            })
+        by_player = list(self._iter_by_player(rows))
 
         # Trends (collection rate over time)
         trends = [{'date': n['date'], 'rate': n['collection_rate']} for n in by_night]
@@ -663,6 +781,34 @@ class VenmoIntegration:
             'trends': trends
         }
 
+    @staticmethod
+    def _iter_by_night(rows) -> Iterator[Dict]:
+        """Yield per-night analytics dicts from a tuple cursor, one row at a time."""
+        for night_id, date, player_count, expected, collected, paid_count in rows:
+            yield {
+                'league_night_id': night_id,
+                'date': date,
+                'player_count': player_count,
+                'expected': expected,
+                'collected': collected,
+                'paid_count': paid_count,
+                'collection_rate': (collected / expected * 100) if expected > 0 else 0
+            }
+
+    @staticmethod
+    def _iter_by_player(rows) -> Iterator[Dict]:
+        """Yield per-player analytics dicts from a tuple cursor, one row at a time."""
+        for player_id, player_name, nights_attended, total_owed, total_paid, outstanding in rows:
+            yield {
+                'player_id': player_id,
+                'player_name': player_name,
+                'nights_attended': nights_attended,
+                'total_owed': total_owed,
+                'total_paid': total_paid,
+                'outstanding': outstanding,
+                'payment_rate': (total_paid / total_owed * 100) if total_owed > 0 else 0
+            }
+
     def get_season_summary(self, season_id: int = None) -> Dict:
         """Get a comprehensive season payment summary.
 
@@ -672,16 +818,16 @@ class VenmoIntegration:
         """
         conn = self.db.get_connection()
         cursor = conn.cursor()
+        # Tuple cursor for the per-row loops: one output dict per row,
+        # without materializing sqlite3.Row or dict(row) first
+        rows = conn.cursor()
+        rows.row_factory = None
 
         # Handle "all seasons" case (season_id = 0)
         if season_id == 0:
             # Get all league nights regardless of season
-            cursor.execute('''
-                SELECT id, date FROM league_nights
-                ORDER BY date
-            ''')
-            nights = [dict(row) for row in cursor.fetchall()]
-            night_ids = [n['id'] for n in nights]
+            rows.execute('SELECT id FROM league_nights ORDER BY date')
+            night_ids = [night_id for (night_id,) in rows]
 
             # Create a synthetic "all seasons" record
             season = {'id': 0, 'name': 'All Seasons', 'is_active': 0, 'start_date': None, 'end_date': None}
@@ -699,14 +845,12 @@ class VenmoIntegration:
             season_id = season['id']
 
             # Get all league nights for this season
-            cursor.execute('''
-                SELECT id, date FROM league_nights
+            rows.execute('''
+                SELECT id FROM league_nights
                 WHERE season_id = ?
                 ORDER BY date
             ''', (season_id,))
-
-            nights = [dict(row) for row in cursor.fetchall()]
-            night_ids = [n['id'] for n in nights]
+            night_ids = [night_id for (night_id,) in rows]
 
         if not night_ids:
             return {
@@ -743,7 +887,7 @@ class VenmoIntegration:
         totals = cursor.fetchone()
 
         # Get per-night details
-        cursor.execute(f'''
+        rows.execute(f'''
             SELECT
                 ln.id,
                 ln.date,
@@ -757,20 +901,20 @@ class VenmoIntegration:
             ORDER BY ln.date
         ''', night_ids)
 
-        night_details = []
-        for row in cursor.fetchall():
-            rate = (row['collected'] / row['expected'] * 100) if row['expected'] > 0 else 0
-            night_details.append({
-                'id': row['id'],
-                'date': row['date'],
-                'player_count': row['player_count'],
-                'expected': row['expected'],
-                'collected': row['collected'],
-                'collection_rate': round(rate, 1)
-            })
+        night_details = [
+            {
+                'id': night_id,
+                'date': date,
+                'player_count': player_count,
+                'expected': expected,
+                'collected': collected,
+                'collection_rate': round((collected / expected * 100) if expected > 0 else 0, 1)
+            }
+            for night_id, date, player_count, expected, collected in rows
+        ]
 
         # Get player payment standings from buyins
-        cursor.execute(f'''
+        rows.execute(f'''
             SELECT
                 p.id,
                 p.name,
@@ -785,20 +929,19 @@ class VenmoIntegration:
             ORDER BY (COALESCE(SUM(b.amount), 0) - COALESCE(SUM(CASE WHEN b.paid = 1 THEN b.amount ELSE 0 END), 0)) DESC
         ''', night_ids)
 
-        player_standings = []
-        for row in cursor.fetchall():
-            outstanding = row['total_owed'] - row['total_paid']
-            rate = (row['total_paid'] / row['total_owed'] * 100) if row['total_owed'] > 0 else 0
-            player_standings.append({
-                'id': row['id'],
-                'name': row['name'],
-                'venmo': row['venmo'],
-                'nights_played': row['nights_played'],
-                'total_owed': row['total_owed'],
-                'total_paid': row['total_paid'],
-                'outstanding': outstanding,
-                'payment_rate': round(rate, 1)
-            })
+        player_standings = [
+            {
+                'id': player_id,
+                'name': name,
+                'venmo': venmo,
+                'nights_played': nights_played,
+                'total_owed': total_owed,
+                'total_paid': total_paid,
+                'outstanding': total_owed - total_paid,
+                'payment_rate': round((total_paid / total_owed * 100) if total_owed > 0 else 0, 1)
+            }
+            for player_id, name, venmo, nights_played, total_owed, total_paid in rows
+        ]
 
         # If no buyins exist yet, get players from matches instead
         # This allows the admin page to show players who have played even before buy-ins are created
@@ -806,34 +949,26 @@ class VenmoIntegration:
             # Get the default buy-in amount from settings
             default_buyin = float(self.db.get_setting('default_buyin', '5'))
             
-            # Count how many nights each player participated in
-            cursor.execute(f'''
-                SELECT player_id, COUNT(DISTINCT league_night_id) as nights_count
-                FROM (
-                    SELECT team1_player1_id as player_id, league_night_id FROM matches WHERE league_night_id IN ({placeholders}) AND team1_player1_id IS NOT NULL
-                    UNION ALL SELECT team1_player2_id, league_night_id FROM matches WHERE league_night_id IN ({placeholders}) AND team1_player2_id IS NOT NULL
-                    UNION ALL SELECT team2_player1_id, league_night_id FROM matches WHERE league_night_id IN ({placeholders}) AND team2_player1_id IS NOT NULL
-                    UNION ALL SELECT team2_player2_id, league_night_id FROM matches WHERE league_night_id IN ({placeholders}) AND team2_player2_id IS NOT NULL
-                )
-                GROUP BY player_id
-            ''', night_ids * 4)
-            
-            player_nights = {row['player_id']: row['nights_count'] for row in cursor.fetchall()}
-            
+            # One query: unnest the four player slots of each match, then
+            # count the nights each player appears in
             cursor.execute(f'''
-                SELECT DISTINCT p.id, p.name, p.venmo
-                FROM players p
-                WHERE p.id IN (
-                    SELECT team1_player1_id FROM matches WHERE league_night_id IN ({placeholders}) AND team1_player1_id IS NOT NULL
-                    UNION SELECT team1_player2_id FROM matches WHERE league_night_id IN ({placeholders}) AND team1_player2_id IS NOT NULL
-                    UNION SELECT team2_player1_id FROM matches WHERE league_night_id IN ({placeholders}) AND team2_player1_id IS NOT NULL
-                    UNION SELECT team2_player2_id FROM matches WHERE league_night_id IN ({placeholders}) AND team2_player2_id IS NOT NULL
+                WITH match_players AS (
+                    SELECT league_night_id, team1_player1_id AS player_id FROM matches
+                    UNION ALL SELECT league_night_id, team1_player2_id FROM matches
+                    UNION ALL SELECT league_night_id, team2_player1_id FROM matches
+                    UNION ALL SELECT league_night_id, team2_player2_id FROM matches
                 )
+                SELECT p.id, p.name, p.venmo,
+                       COUNT(DISTINCT mp.league_night_id) as nights_played
+                FROM match_players mp
+                JOIN players p ON p.id = mp.player_id
+                WHERE mp.league_night_id IN ({placeholders})
+                GROUP BY p.id
                 ORDER BY p.name
-            ''', night_ids * 4)
+            ''', night_ids)
 
             for row in cursor.fetchall():
-                nights_played = player_nights.get(row['id'], 1)
+                nights_played = row['nights_played']
                 total_owed = default_buyin * nights_played
                 player_standings.append({
                     'id': row['id'],
@@ -882,7 +1017,7 @@ class VenmoIntegration:
 
         return {
             'season': dict(season),
-            'total_nights': len(nights),
+            'total_nights': len(night_ids),
             'total_players': total_players,
             'total_expected': total_expected,
             'total_collected': total_collected,
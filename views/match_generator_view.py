@@ -1285,6 +1285,9 @@ class MatchGeneratorView(ctk.CTkFrame):
                 created += 1
             except Exception as e:
                 print(f"Error creating match: {e}")
+
+        # New matches change the matchup history used to avoid repeats
+        self.generator.invalidate_matchup_counts()
         
         total_rounds = schedule.get('total_rounds', 1)
 
@@ -1410,6 +1413,7 @@ class MatchGeneratorView(ctk.CTkFrame):
             self.after(0, self._on_all_names_generated)
 
         self.pair_name_gen._client_initialized = False  # Reset client so key changes are picked up
+        self.pair_name_gen.clear_name_cache()  # Regenerating should produce fresh names
         self.pair_name_gen.generate_names_for_all_pairs(
             pairs_for_gen,
             on_name_ready=on_name_ready,
@@ -321,7 +321,9 @@ class PaymentsView(ctk.CTkFrame):
             ).pack(pady=50)
             return
 
-        summary = self.venmo_mgr.generate_payment_summary(self.current_night_id)
+        summary = self.venmo_mgr.generate_payment_summary(
+            self.current_night_id, include_requests=True
+        )
         requests = summary.get('requests', [])
 
         # Update summary
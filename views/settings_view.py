@@ -6,7 +6,6 @@ Application settings including themes and preferences.
 import customtkinter as ctk
 from tkinter import messagebox, filedialog
 import os
-import shutil
 import hashlib
 from datetime import datetime
 from database import DatabaseManager
@@ -1083,7 +1082,7 @@ class SettingsView(ctk.CTkFrame):
 
         if filepath:
             try:
-                shutil.copy2(self.db.db_path, filepath)
+                self.db.backup_to(filepath)
                 timestamp = datetime.now().strftime('%Y-%m-%d %H:%M')
                 self.db.set_setting('last_backup', timestamp)
                 self.backup_label.configure(text=f'Last backup: {timestamp}')
@@ -1107,10 +1106,10 @@ class SettingsView(ctk.CTkFrame):
                 try:
                     # Create backup of current first
                     backup_path = self.db.db_path + '.before_restore'
-                    shutil.copy2(self.db.db_path, backup_path)
+                    self.db.backup_to(backup_path)
 
                     # Restore
-                    shutil.copy2(filepath, self.db.db_path)
+                    self.db.restore_from(filepath)
                     messagebox.showinfo(
                         "Success",
                         "Backup restored successfully!\n\n"
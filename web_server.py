@@ -148,7 +148,7 @@ class LiveScoreServer:
             from spectator_reactions import get_reaction_manager
             self.reaction_manager = get_reaction_manager()
             # Register callback to notify clients of new reactions
-            self.reaction_manager.register_callback(self._on_reaction)
+            self.reaction_manager.register_callback(self._on_reactions)
         except ImportError:
             # Fallback if spectator_reactions module is not available
             self.reaction_manager = None
@@ -160,8 +160,8 @@ class LiveScoreServer:
         # Setup routes
         self._setup_routes()
     
-    def _on_reaction(self, reaction):
-        """Callback when a new reaction is added - triggers update event."""
+    def _on_reactions(self, reactions):
+        """Callback for a batch of new reactions - triggers one update event."""
         self.notify_update()
 
     def _get_team_name(self, match: dict, team_num: int) -> str:
@@ -2454,8 +2454,9 @@ class LiveScoreServer:
                 return jsonify({'reactions': []})
 
             try:
-                reactions = self.reaction_manager.get_reaction_json()
-                return jsonify({'reactions': reactions})
+                body = self.reaction_manager.get_reaction_bytes()
+                return Response(b'{"reactions":' + body + b'}',
+                                mimetype='application/json')
             except Exception as e:
                 return jsonify({'error': str(e)})
     